@@ -0,0 +1,98 @@
+# Chat throughput through the Socket.IO handlers with and without write-behind batching.
+#
+#   python benchmarks/bench_chat.py [senders] [messages_per_sender]
+#
+# Each sender is a logged-in Socket.IO test client in its own thread, chatting in its
+# own order room. "per-message commit" sets max_pending to 1 so every message is
+# flushed inline, which is what committing in the handler would cost.
+# Runs against a throwaway SQLite file so the real instance database is untouched.
+import os
+import sys
+import tempfile
+import threading
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_chat.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskapp import app, db, socketio  # noqa: E402
+from flaskapp.chat import chat_buffer  # noqa: E402
+from flaskapp.models import User, ServiceProvider, Category, Service, Order, ChatMessage  # noqa: E402
+
+N_SENDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+PER_SENDER = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+
+def seed():
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'image_file': 'default.jpg', 'password': 'x', 'is_admin': False}
+        for i in range(1, N_SENDERS + 2)
+    ])
+    db.session.add(ServiceProvider(id=1, nid='1', bio='', verified=True))
+    db.session.add(Category(id=1, name='Cleaning'))
+    db.session.add(Service(id=1, title='Cleaning', description='', user_id=1, provider_id=1, ratings=3, category_id=1, duration=1, ser_price=10.0))
+    db.session.execute(db.insert(Order), [
+        {'id': i, 'order_loc': 'Dhaka', 'price': 10.0, 'ser_id': 1, 'customer_id': i + 1, 'service_provider_id': 1}
+        for i in range(1, N_SENDERS + 1)
+    ])
+    db.session.commit()
+
+
+def client_for(user_id):
+    flask_client = app.test_client()
+    with flask_client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return socketio.test_client(app, flask_test_client=flask_client)
+
+
+def run(label):
+    with app.app_context():
+        db.session.execute(db.delete(ChatMessage))
+        db.session.commit()
+    clients = [client_for(order_id + 1) for order_id in range(1, N_SENDERS + 1)]
+    for order_id, client in enumerate(clients, start=1):
+        client.emit('join', {'order_id': order_id})
+        client.get_received()
+
+    batches_before = chat_buffer.batches
+
+    def send(order_id, client):
+        for i in range(PER_SENDER):
+            client.emit('send_message', {'order_id': order_id, 'msg': f'message {i} in order {order_id}'})
+
+    threads = [threading.Thread(target=send, args=(order_id, client)) for order_id, client in enumerate(clients, start=1)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    accepted = time.perf_counter() - start
+    chat_buffer.flush()
+    durable = time.perf_counter() - start
+
+    with app.app_context():
+        stored = db.session.query(db.func.count(ChatMessage.id)).scalar()
+    total = N_SENDERS * PER_SENDER
+    for client in clients:
+        client.disconnect()
+    print(f'{label:<22} {total / accepted:>10.0f} {total / durable:>10.0f} {chat_buffer.batches - batches_before:>9} {stored:>8}')
+
+
+def main():
+    with app.app_context():
+        seed()
+    print(f'{N_SENDERS} senders x {PER_SENDER} messages')
+    print(f'{"mode":<22} {"sent/s":>10} {"stored/s":>10} {"commits":>9} {"rows":>8}')
+    max_pending = chat_buffer.max_pending
+    chat_buffer.max_pending = 1
+    run('per-message commit')
+    chat_buffer.max_pending = max_pending
+    run('write-behind batches')
+
+
+if __name__ == '__main__':
+    main()
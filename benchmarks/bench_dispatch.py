@@ -0,0 +1,53 @@
+# Dispatch ranking latency against a freshly seeded throwaway database.
+#
+#   python benchmarks/bench_dispatch.py [providers] [queries]
+#
+# Times the index build (catalog snapshot, load count, numpy arrays) and then ranks the
+# top 5 candidates for random points around the seeded cities in random categories.
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+N_PROVIDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+N_QUERIES = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+def main():
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_dispatch.db')
+    sys.path.insert(0, ROOT)
+    from flaskapp import app, catalog, dispatch, seed
+
+    with app.app_context():
+        seed.load(users=N_PROVIDERS * 10, providers=N_PROVIDERS, orders=N_PROVIDERS * 20, alerts=False, reset=True)
+        start = time.perf_counter()
+        index = dispatch.current_index()
+        build = time.perf_counter() - start
+        categories = [category.id for category in catalog.current().categories]
+        sizes = [len(index.categories[category_id].positions) for category_id in categories]
+
+        rng = random.Random(1)
+        samples = []
+        for _ in range(N_QUERIES):
+            _, city_latitude, city_longitude, _ = rng.choices(seed.CITIES, weights=[city[3] for city in seed.CITIES])[0]
+            latitude, longitude = rng.gauss(city_latitude, 0.1), rng.gauss(city_longitude, 0.1)
+            start = time.perf_counter()
+            dispatch.rank(latitude, longitude, rng.choice(categories), k=5)
+            samples.append(time.perf_counter() - start)
+
+    print(f'{N_PROVIDERS:,} providers, {len(index.provider_ids):,} verified and placed; '
+          f'{min(sizes):,}-{max(sizes):,} per category')
+    print(f'index build {build * 1000:.1f} ms')
+    print(f'rank top 5 over {N_QUERIES:,} queries: p50 {percentile(samples, 0.5) * 1000:.3f} ms, '
+          f'p95 {percentile(samples, 0.95) * 1000:.3f} ms, p99 {percentile(samples, 0.99) * 1000:.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
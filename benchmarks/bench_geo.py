@@ -0,0 +1,89 @@
+# Nearest-provider and radius lookups through the R*Tree index.
+#
+#   python benchmarks/bench_geo.py [n_providers]
+#
+# Runs against a throwaway SQLite file so the real instance database is untouched.
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_geo.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskapp import app, db, geo  # noqa: E402
+from flaskapp.models import User, ServiceProvider, Category, Service  # noqa: E402
+
+N_PROVIDERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+N_CATEGORIES = 10
+CHUNK = 20_000
+REPEAT = 200
+# Providers cluster around a few cities, like real ones do
+CITIES = [(23.81, 90.41), (22.36, 91.78), (22.85, 89.54), (24.37, 88.60), (24.89, 91.87), (22.70, 90.35)]
+
+
+def seed():
+    rng = random.Random(7)
+    db.drop_all()
+    db.create_all()
+    for start in range(1, N_PROVIDERS + 1, CHUNK):
+        ids = range(start, min(start + CHUNK, N_PROVIDERS + 1))
+        db.session.execute(db.insert(User), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'image_file': 'default.jpg', 'password': 'x', 'is_admin': False}
+            for i in ids
+        ])
+        points = []
+        for i in ids:
+            if rng.random() < 0.8:
+                city_lat, city_lon = rng.choice(CITIES)
+                points.append((city_lat + rng.gauss(0, 0.15), city_lon + rng.gauss(0, 0.15)))
+            else:
+                points.append((rng.uniform(20.5, 26.5), rng.uniform(88.0, 92.7)))
+        db.session.execute(db.insert(ServiceProvider), [
+            {'id': i, 'nid': str(i), 'bio': '', 'verified': rng.random() < 0.8, 'latitude': lat, 'longitude': lon}
+            for i, (lat, lon) in zip(ids, points)
+        ])
+    db.session.execute(db.insert(Category), [{'id': i, 'name': f'Category {i}'} for i in range(1, N_CATEGORIES + 1)])
+    for start in range(1, N_PROVIDERS + 1, CHUNK):
+        db.session.execute(db.insert(Service), [
+            {'title': 'Service', 'description': '', 'user_id': i, 'provider_id': i, 'ratings': 3,
+             'category_id': rng.randint(1, N_CATEGORIES), 'duration': 1, 'ser_price': 10.0}
+            for i in range(start, min(start + CHUNK, N_PROVIDERS + 1))
+        ])
+    db.session.commit()
+
+
+def timed(fn):
+    rng = random.Random(11)
+    samples = []
+    for _ in range(REPEAT):
+        lat, lon = rng.uniform(21.0, 26.0), rng.uniform(88.5, 92.5)
+        start = time.perf_counter()
+        fn(lat, lon)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    with app.app_context():
+        start = time.perf_counter()
+        seed()
+        print(f'seeded {N_PROVIDERS} providers in {time.perf_counter() - start:.1f}s')
+        cases = [
+            ('10 nearest', lambda lat, lon: geo.nearest_providers(lat, lon, 10)),
+            ('10 nearest, category', lambda lat, lon: geo.nearest_providers(lat, lon, 10, category_id=3)),
+            ('within 5 km', lambda lat, lon: geo.providers_within(lat, lon, 5)),
+            ('within 5 km, category', lambda lat, lon: geo.providers_within(lat, lon, 5, category_id=3)),
+        ]
+        print(f'{"lookup":<24} {"p50":>8} {"p95":>8} {"p99":>8}  (ms)')
+        for name, fn in cases:
+            p50, p95, p99 = timed(fn)
+            print(f'{name:<24} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
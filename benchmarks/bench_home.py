@@ -0,0 +1,110 @@
+# Home page latency as the number of categories grows.
+#
+#   python benchmarks/bench_home.py
+#
+# Runs against a throwaway SQLite file so the real instance database is untouched.
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_home.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskapp import app, db, leaderboard  # noqa: E402
+from flaskapp.models import User, ServiceProvider, Category, Service, Order  # noqa: E402
+
+SCALES = (5, 50, 500)
+SERVICES_PER_CATEGORY = 6
+ORDERS_PER_SERVICE = 5
+REQUESTS = 100
+
+
+def seed(n_categories):
+    rng = random.Random(n_categories)
+    db.drop_all()
+    db.create_all()
+    n_services = n_categories * SERVICES_PER_CATEGORY
+    db.session.execute(db.insert(User), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'image_file': 'default.jpg', 'password': 'x', 'is_admin': False}
+        for i in range(1, n_services + 1)
+    ])
+    db.session.execute(db.insert(ServiceProvider), [
+        {'id': i, 'nid': str(i), 'bio': '', 'verified': rng.random() < 0.8, 'latitude': 23.0, 'longitude': 90.0}
+        for i in range(1, n_services + 1)
+    ])
+    db.session.execute(db.insert(Category), [
+        {'id': i, 'name': f'Category {i}'} for i in range(1, n_categories + 1)
+    ])
+    db.session.execute(db.insert(Service), [
+        {'id': i, 'title': f'Service {i}', 'description': 'Benchmark service', 'user_id': i, 'provider_id': i,
+         'ratings': rng.randint(1, 5), 'category_id': (i - 1) % n_categories + 1, 'duration': 1, 'ser_price': rng.randint(10, 100)}
+        for i in range(1, n_services + 1)
+    ])
+    db.session.execute(db.insert(Order), [
+        {'order_loc': 'Dhaka', 'price': 10.0, 'ser_id': rng.randint(1, n_services), 'customer_id': 1, 'service_provider_id': 1}
+        for _ in range(n_services * ORDERS_PER_SERVICE)
+    ])
+    db.session.commit()
+
+
+def legacy_top_services_by_category():
+    # The per-category loop the leaderboard replaced, kept here for comparison
+    services_by_category = {}
+    for category in Category.query.all():
+        top_services = (
+            db.session.query(Service, db.func.count(Order.id).label('order_count'))
+            .select_from(Service)
+            .join(ServiceProvider, Service.provider_id == ServiceProvider.id)
+            .outerjoin(Order, Order.ser_id == Service.id)
+            .filter(Service.category_id == category.id, ServiceProvider.verified == True)
+            .group_by(Service.id)
+            .order_by(db.func.count(Order.id).desc())
+            .limit(3)
+            .all()
+        )
+        if top_services:
+            services_by_category[category.name] = [service for service, _ in top_services]
+    return services_by_category
+
+
+def percentiles(fn, repeat=REQUESTS):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    columns = ('legacy', 'cold', 'warm', '/home')
+    print(f'{"categories":>10} ' + ' '.join(f'{name + " p50":>11} {name + " p95":>11}' for name in columns) + '  (ms)')
+    with app.app_context():
+        client = app.test_client()
+
+        def cold():
+            leaderboard.invalidate()
+            leaderboard.top_services_by_category()
+
+        def home():
+            assert client.get('/home').status_code == 200
+
+        for n_categories in SCALES:
+            seed(n_categories)
+            results = (
+                percentiles(legacy_top_services_by_category, repeat=3),
+                percentiles(cold, repeat=20),
+                percentiles(leaderboard.top_services_by_category),
+                percentiles(home),
+            )
+            db.session.remove()
+            print(f'{n_categories:>10} ' + ' '.join(f'{p50:>11.2f} {p95:>11.2f}' for p50, p95 in results))
+
+
+if __name__ == '__main__':
+    main()
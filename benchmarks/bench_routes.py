@@ -0,0 +1,243 @@
+# End-to-end latency of the hot routes and chat events over databases seeded at several scales.
+#
+#   python benchmarks/bench_routes.py [--scale small --scale medium] [--requests 200]
+#                                     [--baseline FILE] [--save-baseline] [--tolerance 0.25]
+#
+# Each scale is seeded with `flask seed`'s generator into a throwaway SQLite file and
+# measured in its own process, so caches and memory never carry over between scales.
+# Requests go through the Flask test client and chat events through the Socket.IO
+# test client, signed in as the busiest customer, the busiest provider and the admin.
+#
+# For every case it reports p50/p95/p99 latency (ms), queries per request and the peak
+# Python memory allocated while serving one request (tracemalloc, measured on separate
+# runs so it does not slow the timed ones). Results are compared with the baseline file
+# when there is one: more queries than the baseline, or p95 latency or peak memory
+# beyond the tolerance, is a regression and the exit status is 1. Latency depends on
+# the machine, so refresh the baseline with --save-baseline where it is compared.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline_routes.json')
+
+SCALES = {
+    'small': {'users': 1_000, 'providers': 100, 'orders': 10_000},
+    'medium': {'users': 10_000, 'providers': 1_000, 'orders': 100_000},
+    'large': {'users': 100_000, 'providers': 10_000, 'orders': 1_000_000},
+}
+WARMUP = 10
+MEMORY_RUNS = 5
+# Differences smaller than these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 0.5
+MIN_MEMORY_DELTA_KB = 64
+
+
+def percentile(samples, p):
+    return samples[min(len(samples) - 1, max(0, int(len(samples) * p + 0.5) - 1))]
+
+
+def measure(scale, n_requests):
+    """Seed one scale and time every case; runs inside the worker process."""
+    import resource
+    import threading
+    import time
+    import tracemalloc
+    from sqlalchemy import event
+    from flaskapp import app, db, socketio, seed
+    from flaskapp.models import Order
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    queries = 0
+    main_thread = threading.get_ident()
+
+    with app.app_context():
+        seconds = seed.load(reset=True, **SCALES[scale])
+
+        def count_query(*args):
+            nonlocal queries
+            # The chat buffer flushes from its own thread; only count the request's queries
+            if threading.get_ident() == main_thread:
+                queries += 1
+
+        # GET requests read through the 'reader' engine of the production storage profile
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', count_query)
+
+        def busiest(column):
+            return db.session.query(column).group_by(column).order_by(db.func.count().desc(), column).limit(1).scalar()
+
+        service_id = busiest(Order.ser_id)
+        customer_id = busiest(Order.customer_id)
+        provider_id = busiest(Order.service_provider_id)
+        chat_order_id = db.session.query(db.func.max(Order.id)).filter(Order.customer_id == customer_id).scalar()
+        db.session.remove()
+
+    def client_for(user_id):
+        client = app.test_client()
+        if user_id is not None:
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+                session['_fresh'] = True
+        return client
+
+    anon, customer, provider, admin = (client_for(user_id) for user_id in (None, customer_id, provider_id, 1))
+    chat_socket = socketio.test_client(app, flask_test_client=customer)
+    chat_socket.emit('join', {'order_id': chat_order_id})
+
+    def get(client, url):
+        def request():
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        return request
+
+    def send_message():
+        chat_socket.emit('send_message', {'order_id': chat_order_id, 'msg': 'Is 5pm still fine?'})
+        chat_socket.get_received()
+
+    def join():
+        chat_socket.emit('join', {'order_id': chat_order_id})
+        chat_socket.get_received()
+
+    cases = [
+        ('GET /home', get(anon, '/home')),
+        ('GET /search_result', get(anon, '/search_result?query=cleaning')),
+        ('GET /search_result filtered', get(anon, '/search_result?query=repair&min_price=20&max_price=80&rating=3')),
+        ('GET /service/<id>', get(anon, f'/service/{service_id}')),
+        ('GET /service/<id>/view_reviews', get(anon, f'/service/{service_id}/view_reviews')),
+        ('GET /alluserorders', get(customer, '/alluserorders')),
+        ('GET /notification', get(provider, '/notification')),
+        ('GET /analytics', get(provider, '/analytics')),
+        ('GET /analytics?bucket=month', get(provider, '/analytics?bucket=month')),
+        ('GET /admin', get(admin, '/admin')),
+        ('GET /admin/section/services', get(admin, '/admin/section/services')),
+        ('GET /chat/<id>/history', get(customer, f'/chat/{chat_order_id}/history')),
+        ('socket join', join),
+        ('socket send_message', send_message),
+    ]
+
+    results = {}
+    for name, run in cases:
+        for _ in range(WARMUP):
+            run()
+        samples = []
+        counts = []
+        for _ in range(n_requests):
+            before = queries
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+            counts.append(queries - before)
+        samples.sort()
+        counts.sort()
+
+        tracemalloc.start()
+        peak = 0
+        for _ in range(MEMORY_RUNS):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            run()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+
+        results[name] = {
+            'p50': round(percentile(samples, 0.50), 3),
+            'p95': round(percentile(samples, 0.95), 3),
+            'p99': round(percentile(samples, 0.99), 3),
+            # Steady-state count; the odd cache refill shows up in the latency tail instead
+            'queries': counts[len(counts) // 2],
+            'peak_kb': round(peak / 1024, 1),
+        }
+    chat_socket.disconnect()
+    return {
+        'seed_seconds': round(seconds, 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'cases': results,
+    }
+
+
+def run_scale(scale, n_requests):
+    # A fresh interpreter per scale, pointed at its own database before flaskapp is imported
+    db_path = os.path.join(tempfile.mkdtemp(), f'bench_routes_{scale}.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', PYTHONWARNINGS='ignore')
+    env.pop('SOCKETIO_MESSAGE_QUEUE', None)
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', scale, '--requests', str(n_requests)],
+        env=env, cwd=ROOT, stdout=subprocess.PIPE, check=True,
+    )
+    os.remove(db_path)
+    return json.loads(completed.stdout.decode().strip().splitlines()[-1])
+
+
+def regressions(current, baseline, tolerance):
+    found = []
+    for name, result in current['cases'].items():
+        base = baseline['cases'].get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            found.append(f'{name}: {result["queries"]} queries, baseline {base["queries"]}')
+        if result['p95'] > base['p95'] * (1 + tolerance) and result['p95'] - base['p95'] > MIN_LATENCY_DELTA_MS:
+            found.append(f'{name}: p95 {result["p95"]:.2f} ms, baseline {base["p95"]:.2f} ms')
+        if result['peak_kb'] > base['peak_kb'] * (1 + tolerance) and result['peak_kb'] - base['peak_kb'] > MIN_MEMORY_DELTA_KB:
+            found.append(f'{name}: peak {result["peak_kb"]:.0f} KB, baseline {base["peak_kb"]:.0f} KB')
+    return found
+
+
+def report(scale, result, baseline):
+    sizes = ', '.join(f'{count:,} {name}' for name, count in SCALES[scale].items())
+    print(f'\n{scale}: {sizes} (seeded in {result["seed_seconds"]}s, max RSS {result["max_rss_mb"]} MB)')
+    print(f'{"case":<32} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8} {"peak KB":>9} {"p95 vs base":>12}')
+    for name, case in result['cases'].items():
+        base = (baseline or {}).get('cases', {}).get(name)
+        delta = f'{(case["p95"] / base["p95"] - 1) * 100:+.0f}%' if base and base['p95'] else '-'
+        print(f'{name:<32} {case["p50"]:>8.2f} {case["p95"]:>8.2f} {case["p99"]:>8.2f} '
+              f'{case["queries"]:>8} {case["peak_kb"]:>9.1f} {delta:>12}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end route and chat latency over seeded databases.')
+    parser.add_argument('--scale', action='append', choices=sorted(SCALES), help='Repeatable; default small and medium.')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per case.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results to the baseline file.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p95 and memory growth over the baseline.')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(measure(args.worker, args.requests)))
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['scales']
+
+    results = {}
+    found = []
+    for scale in args.scale or ['small', 'medium']:
+        results[scale] = run_scale(scale, args.requests)
+        report(scale, results[scale], baseline.get(scale))
+        if scale in baseline:
+            found += [f'{scale} {line}' for line in regressions(results[scale], baseline[scale], args.tolerance)]
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'requests': args.requests, 'scales': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline written to {os.path.relpath(args.baseline, ROOT)}')
+    elif found:
+        print('\nRegressions against the baseline:')
+        for line in found:
+            print(f'  {line}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# Full-text search (FTS5 + bm25) against the old LIKE scan.
+#
+#   python benchmarks/bench_search.py [n_services]
+#
+# Runs against a throwaway SQLite file so the real instance database is untouched.
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_PATH}'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flaskapp import app, db, search  # noqa: E402
+from flaskapp.models import User, ServiceProvider, Category, Service  # noqa: E402
+
+N_SERVICES = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+N_PROVIDERS = 5_000
+CHUNK = 20_000
+REPEAT = 20
+
+CATEGORIES = ['Cleaning', 'Plumbing', 'Electrical', 'Carpentry', 'Painting', 'Gardening', 'Moving', 'Appliance Repair']
+WORDS = [
+    'house', 'office', 'window', 'carpet', 'deep', 'leak', 'drain', 'pipe', 'heater', 'toilet', 'wiring', 'light',
+    'fixture', 'circuit', 'outlet', 'furniture', 'cabinet', 'deck', 'door', 'trim', 'interior', 'exterior',
+    'wallpaper', 'fence', 'staining', 'lawn', 'hedge', 'fridge', 'washer', 'repair', 'installation', 'cleaning',
+]
+QUERIES = [['leak'], ['carpet', 'cleaning'], ['circuit'], ['deck', 'staining'], ['fridge', 'repair'], ['plumbing']]
+# Filler vocabulary so that, as in real listings, any one service word is present in few rows
+FILLER = [f'term{n}' for n in range(5_000)]
+
+
+def zipf_weights(n):
+    return [1 / rank for rank in range(1, n + 1)]
+
+
+def seed():
+    rng = random.Random(42)
+    word_weights = zipf_weights(len(WORDS))
+    filler_weights = zipf_weights(len(FILLER))
+    db.drop_all()
+    db.create_all()
+    db.session.execute(db.insert(User), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'image_file': 'default.jpg', 'password': 'x', 'is_admin': False}
+        for i in range(1, N_PROVIDERS + 1)
+    ])
+    db.session.execute(db.insert(ServiceProvider), [
+        {'id': i, 'nid': str(i), 'bio': '', 'verified': rng.random() < 0.8, 'latitude': 23.0, 'longitude': 90.0}
+        for i in range(1, N_PROVIDERS + 1)
+    ])
+    db.session.execute(db.insert(Category), [{'id': i + 1, 'name': name} for i, name in enumerate(CATEGORIES)])
+    for start in range(1, N_SERVICES + 1, CHUNK):
+        db.session.execute(db.insert(Service), [
+            {'id': i,
+             'title': ' '.join(rng.choices(WORDS, word_weights, k=1) + rng.choices(FILLER, filler_weights, k=2)).title(),
+             'description': ' '.join(rng.choices(FILLER, filler_weights, k=20) + rng.choices(WORDS, word_weights, k=1)),
+             'user_id': (i % N_PROVIDERS) + 1, 'provider_id': (i % N_PROVIDERS) + 1, 'ratings': rng.randint(1, 5),
+             'category_id': rng.randint(1, len(CATEGORIES)), 'duration': 1, 'ser_price': rng.randint(10, 500)}
+            for i in range(start, min(start + CHUNK, N_SERVICES + 1))
+        ])
+    db.session.commit()
+
+
+def timed(fn, words):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        query, _ = fn(words, 50, 300, 2)
+        query.limit(20).all()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    with app.app_context():
+        start = time.perf_counter()
+        seed()
+        print(f'seeded {N_SERVICES} services in {time.perf_counter() - start:.1f}s')
+        print(f'{"query":<20} {"matches":>8} {"LIKE p50":>10} {"LIKE p95":>10} {"FTS p50":>10} {"FTS p95":>10}  (ms, first 20 rows)')
+        for words in QUERIES:
+            matches = search.search_services(words, 50, 300, 2)[0].count()
+            like = timed(search.like_search, words)
+            fts = timed(search.search_services, words)
+            print(f'{" ".join(words):<20} {matches:>8} {like[0]:>10.2f} {like[1]:>10.2f} {fts[0]:>10.2f} {fts[1]:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# Mixed read/write throughput under each SQLite storage profile.
+#
+#   python benchmarks/bench_storage.py [processes] [threads] [seconds] [write_share]
+#
+# Every profile gets a freshly seeded throwaway database, then that many worker
+# processes (like several server workers on one machine) load it at once; the profile
+# is read from SQLITE_PROFILE when flaskapp is imported. Each thread is a signed-in
+# customer with its own test client: most requests are page views (home, search,
+# service details, order list, provider analytics), the rest place orders, which
+# write the order, its analytics rollup and the provider's notification.
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+N_PROCESSES = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+N_THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+SECONDS = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+WRITE_SHARE = float(sys.argv[4]) if len(sys.argv) > 4 else 0.2
+PROFILES = ('default', 'production')
+SCALE = {'users': 2_000, 'providers': 200, 'orders': 20_000}
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+
+def worker(mode, process_index):
+    import random
+    import threading
+    import time
+    sys.path.insert(0, ROOT)
+    from flaskapp import app, db, seed
+    from flaskapp.models import Service
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        if mode == 'seed':
+            seed.load(reset=True, alerts=False, **SCALE)
+            return
+        services = db.session.query(Service.id, Service.provider_id, Service.ser_price).all()
+        db.session.remove()
+
+    # All workers start together; the parent hands out the same start time
+    start_at = float(os.environ['BENCH_STORAGE_START'])
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + SECONDS
+    results = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def run(thread_index):
+        slot = process_index * N_THREADS + thread_index
+        rng = random.Random(slot)
+        customer_id = SCALE['providers'] + 1 + slot
+        provider_id = 1 + slot % SCALE['providers']
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(customer_id)
+            session['_fresh'] = True
+        provider = app.test_client()
+        with provider.session_transaction() as session:
+            session['_user_id'] = str(provider_id)
+            session['_fresh'] = True
+        reads, writes, errors = [], [], 0
+        while time.perf_counter() < deadline:
+            service_id, service_provider_id, price = rng.choice(services)
+            start = time.perf_counter()
+            try:
+                if rng.random() < WRITE_SHARE:
+                    kind = writes
+                    response = client.post('/submitOrder', data={
+                        'location': 'Dhaka', 'datetime': '2025-01-01T10:00', 'price': price,
+                        'service_id': service_id, 'service_provider_id': service_provider_id,
+                    })
+                else:
+                    kind = reads
+                    response = rng.choice((
+                        lambda: client.get('/home'),
+                        lambda: client.get('/search_result?query=cleaning'),
+                        lambda: client.get(f'/service/{service_id}'),
+                        lambda: client.get('/alluserorders'),
+                        lambda: provider.get('/analytics'),
+                    ))()
+                failed = response.status_code >= 500
+            except Exception:
+                failed = True
+            if failed:
+                errors += 1
+            else:
+                kind.append(time.perf_counter() - start)
+        with lock:
+            results['read'] += reads
+            results['write'] += writes
+            results['errors'] += errors
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(N_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(json.dumps(results))
+
+
+def run_profile(profile):
+    import time
+    db_path = os.path.join(tempfile.mkdtemp(), f'bench_storage_{profile}.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', SQLITE_PROFILE=profile, PYTHONWARNINGS='ignore')
+    command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+    subprocess.run(command, env=dict(env, BENCH_STORAGE_WORKER='seed'), cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    # Leave the workers time to import the app before the clock starts
+    env['BENCH_STORAGE_START'] = str(time.time() + 5)
+    workers = [
+        subprocess.Popen(command, env=dict(env, BENCH_STORAGE_WORKER=str(index)), cwd=ROOT,
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        for index in range(N_PROCESSES)
+    ]
+    results = {'read': [], 'write': [], 'errors': 0}
+    for process in workers:
+        output, _ = process.communicate()
+        if process.returncode:
+            raise RuntimeError(f'{profile} worker exited with {process.returncode}')
+        result = json.loads(output.decode().strip().splitlines()[-1])
+        results['read'] += result['read']
+        results['write'] += result['write']
+        results['errors'] += result['errors']
+    return results
+
+
+def main():
+    print(f'{N_PROCESSES} processes x {N_THREADS} threads for {SECONDS:g}s, {WRITE_SHARE:.0%} writes')
+    print(f'{"profile":<12} {"reads/s":>9} {"writes/s":>9} {"read p95":>9} {"write p95":>10} {"errors":>7}  (ms)')
+    for profile in PROFILES:
+        result = run_profile(profile)
+        print(f'{profile:<12} {len(result["read"]) / SECONDS:>9.0f} {len(result["write"]) / SECONDS:>9.0f} '
+              f'{percentile(result["read"], 0.95) * 1000:>9.1f} {percentile(result["write"], 0.95) * 1000:>10.1f} '
+              f'{result["errors"]:>7}')
+
+
+if __name__ == '__main__':
+    mode = os.environ.get('BENCH_STORAGE_WORKER')
+    if mode:
+        worker(mode, 0 if mode == 'seed' else int(mode))
+    else:
+        main()
@@ -1,20 +1,75 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_socketio import SocketIO
+from flaskapp.message_queue import socketio_options
+from flaskapp.storage import RoutingSession, engine_config, apply_pragmas
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = '5791728bb0b18ce0c676dfde280ba245'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///site.db')
+# SQLite pragmas and pooling, see storage.PROFILES; 'default' keeps SQLite's own settings
+app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'production')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'], app.config['SQLALCHEMY_BINDS'] = engine_config(
+    app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLITE_PROFILE'])
+# bcrypt cost factor; stored hashes with a different cost are upgraded on the next login
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+# Hashes that run at once, callers allowed to be hashing or waiting, and seconds one
+# waits for a turn before getting a 503
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 0.5))
+# Shared pub/sub for Socket.IO so emits reach clients on every worker process
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+# Queries one request or Socket.IO event may run, and how often one statement may repeat
+# in it, before it is logged as a problem; views can set their own with @query_budget
+app.config['SQL_QUERY_BUDGET'] = int(os.environ.get('SQL_QUERY_BUDGET', 25))
+app.config['SQL_REPEAT_LIMIT'] = int(os.environ.get('SQL_REPEAT_LIMIT', 5))
+# Raise QueryBudgetExceeded instead of logging; for test runs
+app.config['SQL_STRICT'] = os.environ.get('SQL_STRICT') == '1'
+# Signed-in users' identities kept in memory between requests, and seconds each is kept
+# before it is reloaded (other processes' role changes show up after at most this long)
+app.config['IDENTITY_CACHE_SIZE'] = int(os.environ.get('IDENTITY_CACHE_SIZE', 1024))
+app.config['IDENTITY_CACHE_TTL'] = float(os.environ.get('IDENTITY_CACHE_TTL', 300))
+# Seconds between chat buffer flushes, and the backlog at which a sender flushes inline
+app.config['CHAT_FLUSH_INTERVAL'] = float(os.environ.get('CHAT_FLUSH_INTERVAL', 0.05))
+app.config['CHAT_MAX_PENDING'] = int(os.environ.get('CHAT_MAX_PENDING', 10000))
+# Background threads resizing uploaded profile pictures
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+# Rendered public pages kept by the response cache; 0 turns it off
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+# Longest any cached page is served, whatever its route's ttl; bounds how long writes
+# made by other processes take to show
+app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', 60))
+# Seconds a catalog snapshot is used before it is rebuilt; catalog writes in this
+# process rebuild it sooner, so this bounds how long other processes' writes take to show
+app.config['CATALOG_TTL'] = float(os.environ.get('CATALOG_TTL', 60))
+# Seconds the home page's top services per category are reused; orders placed through
+# other processes show up after at most this long
+app.config['LEADERBOARD_TTL'] = float(os.environ.get('LEADERBOARD_TTL', 60))
+# Dispatch leaves out providers farther than DISPATCH_MAX_KM from the order or already
+# holding DISPATCH_MAX_LOAD accepted, on-the-way or reached orders
+app.config['DISPATCH_MAX_KM'] = float(os.environ.get('DISPATCH_MAX_KM', 50))
+app.config['DISPATCH_MAX_LOAD'] = int(os.environ.get('DISPATCH_MAX_LOAD', 5))
+# Seconds between recounts of provider loads from the database
+app.config['DISPATCH_LOAD_TTL'] = float(os.environ.get('DISPATCH_LOAD_TTL', 60))
+# Before placing an order, offer the customer the best ranked provider in the service's
+# category when that isn't the provider they picked; they book either at its listed price
+app.config['DISPATCH_AUTO_OFFER'] = os.environ.get('DISPATCH_AUTO_OFFER') == '1'
+# When set, /metrics requires "Authorization: Bearer <token>"
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
 
-socketio = SocketIO(app)
-db = SQLAlchemy(app)
+socketio = SocketIO(app, **socketio_options(app.config['SOCKETIO_MESSAGE_QUEUE']))
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+with app.app_context():
+    apply_pragmas(db, app.config['SQLITE_PROFILE'])
 migrate = Migrate(app, db)
 bcrypt = Bcrypt(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
 
-from flaskapp import routes
\ No newline at end of file
+from flaskapp import sql_stats, routes, geo, chat, seed, monitoring, query_plans
\ No newline at end of file
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import click
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from flaskapp import app, db
+from flaskapp.models import ProviderDailyStats, Order, Service
+
+COUNTERS = ('orders', 'revenue', 'new_customers', 'rating_sum', 'rating_count', 'complaints')
+BUCKETS = ('day', 'week', 'month')
+
+
+def _day(value):
+    return (value or datetime.utcnow()).date()
+
+
+def _bump(provider_id, service_id, day, **deltas):
+    # Upsert that adds deltas to the row's counters, creating the row on first use
+    stmt = sqlite_insert(ProviderDailyStats).values(provider_id=provider_id, service_id=service_id, day=day, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['provider_id', 'service_id', 'day'],
+        set_={name: getattr(ProviderDailyStats, name) + stmt.excluded[name] for name in deltas},
+    )
+    db.session.execute(stmt)
+
+
+# The record_* helpers run inside the caller's transaction, so the rollup commits
+# (or rolls back) together with the write it describes.
+def record_order(order):
+    first_order = not db.session.query(
+        Order.query.filter(
+            Order.service_provider_id == order.service_provider_id,
+            Order.customer_id == order.customer_id,
+            Order.id != order.id,
+        ).exists()
+    ).scalar()
+    _bump(order.service_provider_id, order.ser_id, _day(order.order_datetime),
+          orders=1, revenue=order.price or 0, new_customers=int(first_order))
+
+
+def record_review(order, old_rate, new_rate):
+    _bump(order.service_provider_id, order.ser_id, _day(order.order_datetime),
+          rating_sum=(new_rate or 0) - (old_rate or 0),
+          rating_count=(new_rate is not None) - (old_rate is not None))
+
+
+def record_complaint(complaint, order):
+    _bump(order.service_provider_id, order.ser_id, _day(complaint.date_posted), complaints=1)
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def provider_summary(provider_id, bucket='day'):
+    """Totals, top service and a revenue series for one provider, from a single query."""
+    rows = (
+        db.session.query(ProviderDailyStats, Service.title)
+        .join(Service, Service.id == ProviderDailyStats.service_id)
+        .filter(ProviderDailyStats.provider_id == provider_id)
+        .order_by(ProviderDailyStats.day)
+        .all()
+    )
+
+    totals = dict.fromkeys(COUNTERS, 0)
+    orders_per_service = {}
+    series = OrderedDict()
+    for stats, title in rows:
+        for name in COUNTERS:
+            totals[name] += getattr(stats, name)
+        orders_per_service[title] = orders_per_service.get(title, 0) + stats.orders
+        point = series.setdefault(_bucket_start(stats.day, bucket), {'orders': 0, 'revenue': 0.0})
+        point['orders'] += stats.orders
+        point['revenue'] += stats.revenue
+
+    most_requested = max(orders_per_service.items(), key=lambda item: item[1]) if orders_per_service else None
+    return {
+        "total_orders": totals['orders'],
+        "revenue": totals['revenue'],
+        "most_requested_service": most_requested[0] if most_requested and most_requested[1] else "N/A",
+        "total_customers": totals['new_customers'],
+        "average_rating": round(totals['rating_sum'] / totals['rating_count'], 2) if totals['rating_count'] else 0.0,
+        "total_complaints": totals['complaints'],
+        "series": [{'start': start, **point} for start, point in series.items()],
+    }
+
+
+BACKFILL_SQL = [
+    "DELETE FROM provider_daily_stats",
+    """INSERT INTO provider_daily_stats
+        (provider_id, service_id, day, orders, revenue, new_customers, rating_sum, rating_count, complaints)
+    SELECT service_provider_id, ser_id, date(order_datetime), count(*), coalesce(sum(price), 0), 0,
+           coalesce(sum(rate), 0), count(rate), 0
+    FROM "order" GROUP BY service_provider_id, ser_id, date(order_datetime)""",
+    # A customer counts as new on the day of their first order with the provider
+    """INSERT INTO provider_daily_stats (provider_id, service_id, day, new_customers)
+    SELECT service_provider_id, ser_id, date(order_datetime), count(*) FROM (
+        SELECT service_provider_id, ser_id, order_datetime,
+               row_number() OVER (PARTITION BY service_provider_id, customer_id ORDER BY id) AS position
+        FROM "order"
+    ) WHERE position = 1
+    GROUP BY service_provider_id, ser_id, date(order_datetime)
+    ON CONFLICT (provider_id, service_id, day) DO UPDATE SET new_customers = excluded.new_customers""",
+    """INSERT INTO provider_daily_stats (provider_id, service_id, day, complaints)
+    SELECT o.service_provider_id, o.ser_id, date(c.date_posted), count(*)
+    FROM complaint AS c JOIN "order" AS o ON o.id = c.order_id
+    GROUP BY o.service_provider_id, o.ser_id, date(c.date_posted)
+    ON CONFLICT (provider_id, service_id, day) DO UPDATE SET complaints = excluded.complaints""",
+]
+
+
+def backfill():
+    for statement in BACKFILL_SQL:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+    return db.session.query(db.func.count()).select_from(ProviderDailyStats).scalar()
+
+
+@app.cli.command('analytics-backfill')
+def analytics_backfill_command():
+    """Rebuild the provider analytics rollup from orders and complaints."""
+    click.echo(f'Rebuilt {backfill()} provider analytics rows.')
@@ -0,0 +1,163 @@
+import threading
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from flaskapp import app, db
+from flaskapp.models import Service, ServiceProvider, Category
+
+
+class CategoryRecord:
+    __slots__ = ('id', 'name')
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+class ProviderRecord:
+    __slots__ = ('id', 'latitude', 'longitude')
+
+    def __init__(self, id, latitude, longitude):
+        self.id = id
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class ServiceSummary:
+    __slots__ = ('id', 'title', 'description', 'ser_price', 'ratings', 'duration', 'category_id', 'provider_id')
+
+    def __init__(self, id, title, description, ser_price, ratings, duration, category_id, provider_id):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.ser_price = ser_price
+        self.ratings = ratings
+        self.duration = duration
+        self.category_id = category_id
+        self.provider_id = provider_id
+
+
+class Catalog:
+    """Categories, verified providers and their services as of one version. Never
+    changed after it is built; a newer version replaces it whole."""
+    __slots__ = ('version', 'built_at', 'categories', 'verified_providers', '_categories_by_id', '_services_by_category')
+
+    def __init__(self, version, categories, verified_providers, services):
+        self.version = version
+        self.built_at = time.monotonic()
+        # Sorted by name
+        self.categories = tuple(categories)
+        # Provider id to ProviderRecord
+        self.verified_providers = {provider.id: provider for provider in verified_providers}
+        self._categories_by_id = {category.id: category for category in self.categories}
+        by_category = {}
+        for service in services:
+            by_category.setdefault(service.category_id, []).append(service)
+        # Each category's services of verified providers, best rated first
+        self._services_by_category = {category_id: tuple(items) for category_id, items in by_category.items()}
+
+    def category(self, category_id):
+        return self._categories_by_id.get(category_id)
+
+    def services_in(self, category_id):
+        return self._services_by_category.get(category_id, ())
+
+    def top_rated(self, category_id):
+        services = self.services_in(category_id)
+        return services[0] if services else None
+
+
+# Rewritten by every review (see ratings.record_rating); the snapshot's ratings catch
+# up with them on CATALOG_TTL rather than forcing a rebuild per review
+RATING_COLUMNS = frozenset(('rating_sum', 'rating_count', 'ratings'))
+
+_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_snapshot = None
+_version = 0
+
+
+def _build(version):
+    categories = [CategoryRecord(*row) for row in db.session.execute(
+        db.select(Category.id, Category.name).order_by(Category.name, Category.id))]
+    verified = [ProviderRecord(*row) for row in db.session.execute(
+        db.select(ServiceProvider.id, ServiceProvider.latitude, ServiceProvider.longitude)
+        .where(ServiceProvider.verified == True))]
+    services = [ServiceSummary(*row) for row in db.session.execute(
+        db.select(Service.id, Service.title, Service.description, Service.ser_price, Service.ratings,
+                  Service.duration, Service.category_id, Service.provider_id)
+        .join(ServiceProvider, Service.provider_id == ServiceProvider.id)
+        .where(ServiceProvider.verified == True)
+        .order_by(Service.ratings.desc(), Service.id)
+    )]
+    return Catalog(version, categories, verified, services)
+
+
+def _is_fresh(snapshot, version):
+    return snapshot is not None and snapshot.version == version and \
+        time.monotonic() - snapshot.built_at < app.config['CATALOG_TTL']
+
+
+def current():
+    """The catalog snapshot, rebuilt first if a catalog write has committed in this
+    process since, or if it is older than CATALOG_TTL (writes made by other processes,
+    and rating changes)."""
+    global _snapshot
+    with _lock:
+        snapshot, version = _snapshot, _version
+    if _is_fresh(snapshot, version):
+        return snapshot
+
+    # One thread rebuilds; the others keep using the previous snapshot meanwhile
+    if not _rebuild_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        with _lock:
+            snapshot, version = _snapshot, _version
+        if _is_fresh(snapshot, version):
+            return snapshot
+        fresh = _build(version)
+        with _lock:
+            # A write that committed during the build has bumped _version, so the
+            # next call rebuilds again
+            _snapshot = fresh
+        return fresh
+    finally:
+        _rebuild_lock.release()
+
+
+def invalidate():
+    global _version
+    with _lock:
+        _version += 1
+
+
+def _affects_catalog(session):
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, (Service, ServiceProvider, Category)):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, Service):
+            changed = {attr.key for attr in inspect(obj).attrs if attr.history.has_changes()}
+            if changed - RATING_COLUMNS:
+                return True
+        elif isinstance(obj, (ServiceProvider, Category)) and session.is_modified(obj):
+            return True
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_dirty(session, flush_context):
+    if _affects_catalog(session):
+        session.info['catalog_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('catalog_dirty', False):
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('catalog_dirty', None)
@@ -0,0 +1,198 @@
+import atexit
+import threading
+from datetime import datetime
+from flask import render_template, request, jsonify, abort
+from flask_login import current_user, login_required
+from flask_socketio import emit, join_room, leave_room, rooms
+from flaskapp import app, db, socketio
+from flaskapp.metrics import timed_event, socketio_emits
+from flaskapp.models import ChatMessage, Order, User
+from flaskapp.pagination import keyset_paginate
+from flaskapp.storage import WRITE_BEHIND
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+def order_room(order_id):
+    return f'order_{order_id}'
+
+
+def _serialize(message, username):
+    return {
+        'order_id': message['order_id'],
+        'user_id': message['user_id'],
+        'username': username,
+        'msg': message['body'],
+        'created_at': message['created_at'].isoformat(),
+    }
+
+
+class ChatBuffer:
+    """Write-behind buffer for chat messages.
+
+    Senders only append to memory; a background task drains the buffer every
+    flush_interval seconds and inserts everything queued since the last flush in a
+    single transaction. If writes fall behind by max_pending messages the sender
+    flushes inline, so memory stays bounded.
+    """
+
+    def __init__(self, flush_interval=0.05, max_pending=10000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        # Serializes flushes so batches commit in the order they were queued
+        self._flush_lock = threading.Lock()
+        self._task = None
+        self.flushed = 0
+        self.batches = 0
+
+    def add(self, order_id, user_id, body, username=None):
+        message = {'order_id': order_id, 'user_id': user_id, 'body': body, 'created_at': datetime.utcnow(), 'username': username}
+        with self._lock:
+            self._pending.append(message)
+            backlog = len(self._pending)
+            if self._task is None:
+                self._task = socketio.start_background_task(self._run)
+        if backlog >= self.max_pending:
+            self.flush()
+        return message
+
+    def pending_for(self, order_id):
+        with self._lock:
+            return [message for message in self._pending if message['order_id'] == order_id]
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                # Messages stay visible to pending_for until their batch is committed
+                batch = list(self._pending)
+            if not batch:
+                return 0
+            rows = [{key: message[key] for key in ('order_id', 'user_id', 'body', 'created_at')} for message in batch]
+            with app.app_context():
+                # The reserved write-behind connection when the storage profile has one
+                engine = db.engines.get(WRITE_BEHIND, db.engine)
+                with engine.begin() as connection:
+                    connection.execute(db.insert(ChatMessage), rows)
+            with self._lock:
+                del self._pending[:len(batch)]
+            self.flushed += len(batch)
+            self.batches += 1
+            return len(batch)
+
+    def _run(self):
+        while True:
+            socketio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                app.logger.exception('Chat flush failed; retrying with the next batch')
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {'pending': pending, 'flushed': self.flushed, 'batches': self.batches}
+
+
+chat_buffer = ChatBuffer(
+    flush_interval=app.config['CHAT_FLUSH_INTERVAL'],
+    max_pending=app.config['CHAT_MAX_PENDING'],
+)
+atexit.register(chat_buffer.flush)
+
+
+def _order_id(data):
+    order_id = data.get('order_id') if isinstance(data, dict) else None
+    return order_id if isinstance(order_id, int) else None
+
+
+def is_participant(order, user):
+    return order is not None and user.id in (order.customer_id, order.service_provider_id)
+
+
+def history(order_id, cursor=None, per_page=None):
+    """One page of an order's chat, newest first from the database plus anything
+    still waiting in the write-behind buffer on the first page."""
+    # Read the buffer first: a batch committing in between then shows up twice
+    # (and is dropped below) rather than not at all
+    pending = chat_buffer.pending_for(order_id) if cursor is None else []
+    query = (
+        db.session.query(ChatMessage, User.username)
+        .join(User, User.id == ChatMessage.user_id)
+        .filter(ChatMessage.order_id == order_id)
+    )
+    page = keyset_paginate(query, [(ChatMessage.id, True)], cursor, per_page)
+    messages = [
+        _serialize({'order_id': m.order_id, 'user_id': m.user_id, 'body': m.body, 'created_at': m.created_at}, username)
+        for m, username in reversed(page.items)
+    ]
+    if pending:
+        stored = {(message['user_id'], message['created_at']) for message in messages}
+        for message in pending:
+            serialized = _serialize(message, message['username'])
+            if (serialized['user_id'], serialized['created_at']) not in stored:
+                messages.append(serialized)
+    return messages, page.next_cursor
+
+
+@app.route('/chat/<int:order_id>')
+@login_required
+def chat(order_id):
+    order = Order.query.get_or_404(order_id)
+    if not is_participant(order, current_user):
+        abort(403)
+    return render_template('chat.html', title='Chat', order=order)
+
+
+@app.route('/chat/<int:order_id>/history')
+@login_required
+def chat_history(order_id):
+    order = db.session.get(Order, order_id)
+    if not is_participant(order, current_user):
+        abort(403)
+    messages, older = history(order_id, request.args.get('cursor'), request.args.get('per_page', type=int))
+    return jsonify({'messages': messages, 'older_cursor': older})
+
+
+# Handle a user joining an order's chat room
+@socketio.on('join')
+@timed_event
+def on_join(data):
+    order_id = _order_id(data)
+    order = db.session.get(Order, order_id) if order_id is not None else None
+    if not current_user.is_authenticated or not is_participant(order, current_user):
+        emit('chat_error', {'msg': 'You are not part of this order.'})
+        socketio_emits.inc(event='chat_error')
+        return
+    room = order_room(order_id)
+    join_room(room)
+    emit('message', {'msg': f'{current_user.username} has joined the room.'}, room=room)
+    socketio_emits.inc(event='message')
+
+
+# Handle a user leaving a chat room
+@socketio.on('leave')
+@timed_event
+def on_leave(data):
+    room = order_room(_order_id(data))
+    if room in rooms():
+        leave_room(room)
+        emit('message', {'msg': f'{current_user.username} has left the room.'}, room=room)
+        socketio_emits.inc(event='message')
+
+
+# Handle messages sent by users; only sockets that passed the join check are in the room
+@socketio.on('send_message')
+@timed_event
+def handle_message(data):
+    if not isinstance(data, dict):
+        return
+    order_id = _order_id(data)
+    body = str(data.get('msg') or '').strip()[:MAX_MESSAGE_LENGTH]
+    room = order_room(order_id)
+    if order_id is None or not body or room not in rooms():
+        return
+    message = chat_buffer.add(order_id, current_user.id, body, current_user.username)
+    emit('message', _serialize(message, current_user.username), room=room)
+    socketio_emits.inc(event='message')
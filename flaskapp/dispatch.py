@@ -0,0 +1,196 @@
+import math
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from flask import request, jsonify, abort
+from flask_login import login_required
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flaskapp import app, db, catalog
+from flaskapp.geo import EARTH_RADIUS_KM
+from flaskapp.models import Order, OrderStatus
+
+# Orders that keep a provider busy; this count is the provider's load
+ACTIVE_STATUSES = (OrderStatus.accepted, OrderStatus.on_the_way, OrderStatus.reached)
+
+# A candidate's score is the weighted sum of three penalties between 0 and 1: distance
+# as a share of DISPATCH_MAX_KM, missing stars out of 5, and load as a share of
+# DISPATCH_MAX_LOAD. Lowest score ranks first.
+DISTANCE_WEIGHT = 0.5
+RATING_WEIGHT = 0.3
+LOAD_WEIGHT = 0.2
+
+Candidate = namedtuple('Candidate', ['provider_id', 'service_id', 'distance_km', 'rating', 'load', 'score'])
+
+
+class CategoryIndex:
+    __slots__ = ('positions', 'service_ids', 'ratings')
+
+    def __init__(self, positions, service_ids, ratings):
+        # Row of each provider in the DispatchIndex arrays, with their best service here
+        self.positions = np.array(positions, dtype=np.intp)
+        self.service_ids = np.array(service_ids, dtype=np.int64)
+        self.ratings = np.array(ratings, dtype=np.float64)
+
+
+class DispatchIndex:
+    """Verified providers of one catalog snapshot as numpy arrays, one row per provider,
+    and per category the rows of the providers offering a service in it."""
+
+    def __init__(self, snapshot, loads):
+        self.snapshot = snapshot
+        providers = [provider for provider in snapshot.verified_providers.values()
+                     if provider.latitude is not None and provider.longitude is not None]
+        self.provider_ids = np.array([provider.id for provider in providers], dtype=np.int64)
+        self.rows = {provider.id: row for row, provider in enumerate(providers)}
+        self.latitude = np.radians(np.array([provider.latitude for provider in providers], dtype=np.float64))
+        self.longitude = np.radians(np.array([provider.longitude for provider in providers], dtype=np.float64))
+        self.cos_latitude = np.cos(self.latitude)
+        self.load = np.array([loads.get(provider.id, 0) for provider in providers], dtype=np.int64)
+        self.categories = {}
+        for category in snapshot.categories:
+            positions, service_ids, ratings = [], [], []
+            seen = set()
+            # Best rated first, so the first service seen is the provider's best here
+            for service in snapshot.services_in(category.id):
+                row = self.rows.get(service.provider_id)
+                if row is None or row in seen:
+                    continue
+                seen.add(row)
+                positions.append(row)
+                service_ids.append(service.id)
+                ratings.append(service.ratings or 0)
+            self.categories[category.id] = CategoryIndex(positions, service_ids, ratings)
+
+
+_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_index = None
+# Provider id to active order count, and when it was last counted in the database
+_loads = {}
+_loads_counted_at = None
+
+
+def _count_loads():
+    rows = db.session.execute(
+        db.select(Order.service_provider_id, db.func.count())
+        .where(Order.status.in_(ACTIVE_STATUSES))
+        .group_by(Order.service_provider_id)
+    )
+    return {provider_id: count for provider_id, count in rows}
+
+
+def _loads_expired(now):
+    return _loads_counted_at is None or now - _loads_counted_at >= app.config['DISPATCH_LOAD_TTL']
+
+
+def current_index():
+    """The DispatchIndex for the current catalog snapshot. Loads follow the commits of
+    this process as they happen, and are recounted every DISPATCH_LOAD_TTL seconds to
+    pick up other processes' changes."""
+    global _index, _loads, _loads_counted_at
+    snapshot = catalog.current()
+    with _lock:
+        index = _index
+    if index is not None and index.snapshot is snapshot and not _loads_expired(time.monotonic()):
+        return index
+
+    with _rebuild_lock:
+        now = time.monotonic()
+        with _lock:
+            index = _index
+            recount = _loads_expired(now)
+            loads = dict(_loads)
+        if index is not None and index.snapshot is snapshot and not recount:
+            return index
+        if recount:
+            loads = _count_loads()
+        index = DispatchIndex(snapshot, loads)
+        with _lock:
+            _index = index
+            if recount:
+                _loads, _loads_counted_at = loads, now
+        return index
+
+
+def rank(latitude, longitude, category_id, k=5, exclude=()):
+    """Up to k Candidates for an order at (latitude, longitude) in a category, best
+    first. Providers beyond DISPATCH_MAX_KM, or with DISPATCH_MAX_LOAD active orders,
+    are left out, as are the provider ids in exclude."""
+    index = current_index()
+    category = index.categories.get(category_id)
+    if category is None or not len(category.positions):
+        return []
+    max_km = app.config['DISPATCH_MAX_KM']
+    max_load = app.config['DISPATCH_MAX_LOAD']
+
+    rows = category.positions
+    latitude, longitude = math.radians(latitude), math.radians(longitude)
+    # Haversine over every provider in the category at once
+    half_chord = (np.sin((index.latitude[rows] - latitude) / 2) ** 2
+                  + math.cos(latitude) * index.cos_latitude[rows] * np.sin((index.longitude[rows] - longitude) / 2) ** 2)
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(half_chord, 1.0)))
+    load = index.load[rows]
+    score = (DISTANCE_WEIGHT * distance / max_km
+             + RATING_WEIGHT * (1 - category.ratings / 5)
+             + LOAD_WEIGHT * load / max_load)
+
+    eligible = (distance <= max_km) & (load < max_load)
+    for provider_id in exclude:
+        row = index.rows.get(provider_id)
+        if row is not None:
+            eligible &= rows != row
+    score = np.where(eligible, score, np.inf)
+    k = min(k, int(np.count_nonzero(eligible)))
+    if k <= 0:
+        return []
+    best = np.argpartition(score, k - 1)[:k]
+    best = best[np.argsort(score[best], kind='stable')]
+    return [
+        Candidate(int(index.provider_ids[rows[i]]), int(category.service_ids[i]), round(float(distance[i]), 3),
+                  float(category.ratings[i]), int(load[i]), round(float(score[i]), 4))
+        for i in best
+    ]
+
+
+def load_change(source, target):
+    return (target in ACTIVE_STATUSES) - (source in ACTIVE_STATUSES)
+
+
+def track_load(provider_id, delta):
+    """Change provider_id's load by delta once the current transaction commits."""
+    if delta:
+        pending = db.session.info.setdefault('dispatch_load', {})
+        pending[provider_id] = pending.get(provider_id, 0) + delta
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_load_on_commit(session):
+    pending = session.info.pop('dispatch_load', None)
+    if not pending:
+        return
+    with _lock:
+        for provider_id, delta in pending.items():
+            load = _loads[provider_id] = max(0, _loads.get(provider_id, 0) + delta)
+            row = _index.rows.get(provider_id) if _index is not None else None
+            if row is not None:
+                _index.load[row] = load
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('dispatch_load', None)
+
+
+@app.route('/dispatch/candidates')
+@login_required
+def dispatch_candidates():
+    latitude = request.args.get('lat', type=float)
+    longitude = request.args.get('lon', type=float)
+    category_id = request.args.get('category', type=int)
+    if latitude is None or longitude is None or not -90 <= latitude <= 90 or not -180 <= longitude <= 180 \
+            or category_id is None:
+        abort(400)
+    k = max(1, min(request.args.get('k', 5, type=int), 50))
+    return jsonify([candidate._asdict() for candidate in rank(latitude, longitude, category_id, k)])
@@ -0,0 +1,160 @@
+import math
+from collections import namedtuple
+import click
+from flask import request, jsonify, abort
+from sqlalchemy import event, text
+from flaskapp import app, db
+
+EARTH_RADIUS_KM = 6371.0088
+# kNN starts with a small search box and doubles it until k providers fall inside the circle
+INITIAL_RADIUS_KM = 2.0
+MAX_RADIUS_KM = 2 * math.pi * EARTH_RADIUS_KM
+
+NearbyProvider = namedtuple('NearbyProvider', ['id', 'latitude', 'longitude', 'distance_km'])
+
+RTREE_DDL = [
+    # Providers are points, stored as degenerate boxes
+    """CREATE VIRTUAL TABLE IF NOT EXISTS provider_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)""",
+    """CREATE TRIGGER IF NOT EXISTS provider_rtree_ai AFTER INSERT ON service_provider
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO provider_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS provider_rtree_au AFTER UPDATE OF id, latitude, longitude ON service_provider BEGIN
+        DELETE FROM provider_rtree WHERE id = old.id;
+        INSERT INTO provider_rtree
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS provider_rtree_ad AFTER DELETE ON service_provider BEGIN
+        DELETE FROM provider_rtree WHERE id = old.id;
+    END""",
+]
+
+REBUILD_SQL = """
+    INSERT INTO provider_rtree
+    SELECT id, latitude, latitude, longitude, longitude FROM service_provider
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+"""
+
+BOX_QUERY = """
+    SELECT sp.id, sp.latitude, sp.longitude
+    FROM provider_rtree AS r JOIN service_provider AS sp ON sp.id = r.id
+    WHERE r.max_lat >= :min_lat AND r.min_lat <= :max_lat
+      AND r.max_lon >= :min_lon AND r.min_lon <= :max_lon
+"""
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_spatial_index(target, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in RTREE_DDL:
+        connection.exec_driver_sql(statement)
+    indexed = connection.exec_driver_sql("SELECT count(*) FROM provider_rtree").scalar()
+    if not indexed:
+        connection.exec_driver_sql(REBUILD_SQL)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_spatial_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS provider_rtree")
+
+
+def rebuild_index():
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM provider_rtree")
+        connection.exec_driver_sql(REBUILD_SQL)
+        return connection.exec_driver_sql("SELECT count(*) FROM provider_rtree").scalar()
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _bounding_box(lat, lon, radius_km):
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angular)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    cos_lat = math.cos(math.radians(lat))
+    # A circle reaching over a pole covers every longitude
+    if min_lat <= -90 or max_lat >= 90 or math.sin(angular) >= cos_lat:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    dlon = math.degrees(math.asin(math.sin(angular) / cos_lat))
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def _box_candidates(lat, lon, radius_km, category_id, verified):
+    min_lat, max_lat, min_lon, max_lon = _bounding_box(lat, lon, radius_km)
+    sql = BOX_QUERY
+    params = {'min_lat': min_lat, 'max_lat': max_lat}
+    if verified is not None:
+        sql += " AND sp.verified = :verified"
+        params['verified'] = bool(verified)
+    if category_id is not None:
+        sql += " AND EXISTS (SELECT 1 FROM service WHERE service.provider_id = sp.id AND service.category_id = :category_id)"
+        params['category_id'] = category_id
+
+    # A window crossing the antimeridian is split into two boxes
+    windows = []
+    if min_lon < -180:
+        windows += [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    elif max_lon > 180:
+        windows += [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    else:
+        windows.append((min_lon, max_lon))
+
+    rows = []
+    for window_min, window_max in windows:
+        rows += db.session.execute(text(sql), {**params, 'min_lon': window_min, 'max_lon': window_max}).all()
+    return rows
+
+
+def providers_within(lat, lon, radius_km, category_id=None, verified=True, limit=None):
+    """Providers within radius_km of (lat, lon), nearest first. verified=None disables that filter."""
+    found = []
+    for provider_id, p_lat, p_lon in _box_candidates(lat, lon, radius_km, category_id, verified):
+        distance = haversine_km(lat, lon, p_lat, p_lon)
+        if distance <= radius_km:
+            found.append(NearbyProvider(provider_id, p_lat, p_lon, distance))
+    found.sort(key=lambda provider: (provider.distance_km, provider.id))
+    return found[:limit] if limit is not None else found
+
+
+def nearest_providers(lat, lon, k=10, category_id=None, verified=True, max_radius_km=MAX_RADIUS_KM):
+    radius = INITIAL_RADIUS_KM
+    while True:
+        radius = min(radius, max_radius_km)
+        found = providers_within(lat, lon, radius, category_id, verified)
+        # Everything inside the circle is exact, so k hits there are the true k nearest
+        if len(found) >= k or radius >= max_radius_km:
+            return found[:k]
+        radius *= 2
+
+
+@app.route('/providers/nearby')
+def nearby_providers():
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        abort(400)
+    category_id = request.args.get('category', type=int)
+    radius = request.args.get('radius', type=float)
+    k = max(1, min(request.args.get('k', 10, type=int), 100))
+
+    if radius is not None:
+        providers = providers_within(lat, lon, min(radius, MAX_RADIUS_KM), category_id, limit=k)
+    else:
+        providers = nearest_providers(lat, lon, k, category_id)
+    return jsonify([provider._asdict() for provider in providers])
+
+
+@app.cli.command('geo-reindex')
+def geo_reindex_command():
+    """Rebuild the provider spatial index from service_provider coordinates."""
+    db.create_all()
+    click.echo(f'Indexed {rebuild_index()} providers.')
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from flaskapp import app
+
+
+class IdentityCache:
+    # Bounded LRU of detached user snapshots, each entry also expiring after ttl seconds
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, user_id, user, extra=None):
+        snapshot = _snapshot(user)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, snapshot, extra)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _snapshot(instance):
+    # A detached copy holding only column values, safe to share between sessions and threads.
+    # Callers attach it to their own session with session.merge(snapshot, load=False).
+    mapper = inspect(instance).mapper
+    snapshot = mapper.class_manager.new_instance()
+    for attr in mapper.column_attrs:
+        setattr(snapshot, attr.key, getattr(instance, attr.key))
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+identity_cache = IdentityCache(
+    maxsize=app.config['IDENTITY_CACHE_SIZE'],
+    ttl=app.config['IDENTITY_CACHE_TTL'],
+)
+
+
+# Write-through invalidation: any committed change to a user or to their provider row
+# (which carries the role flags) drops that user's cached identity.
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    from flaskapp.models import User, ServiceProvider
+
+    changed = session.info.setdefault('identity_cache_dirty', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (User, ServiceProvider)) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    changed = session.info.pop('identity_cache_dirty', None)
+    if changed:
+        identity_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('identity_cache_dirty', None)
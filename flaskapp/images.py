@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+import time
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import request, url_for
+from PIL import Image, UnidentifiedImageError
+from flaskapp import app, db
+
+PROFILE_PICS = os.path.join(app.root_path, 'static', 'profile_pics')
+DEFAULT_PICTURE = 'default.jpg'
+# Side lengths of the square-bounded variants; the first one is the stored image_file
+SIZES = (125, 250)
+ALLOWED_FORMATS = {'JPEG', 'PNG'}
+# Files younger than this are never collected, so uploads still being processed
+# (or whose account change has not committed yet) are safe
+GC_GRACE_SECONDS = 3600
+
+executor = ThreadPoolExecutor(
+    max_workers=app.config['IMAGE_WORKERS'],
+    thread_name_prefix='image-worker',
+)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _variant(digest, size, ext):
+    suffix = '' if size == SIZES[0] else f'_{size}'
+    return f'{digest}{suffix}{ext}'
+
+
+def _variants(image_file):
+    digest, ext = os.path.splitext(image_file)
+    names = []
+    for size in SIZES:
+        names += [_variant(digest, size, ext), _variant(digest, size, '.webp')]
+    return names
+
+
+def submit_picture(upload):
+    """Queue an uploaded picture for processing and return its content-addressed
+    image_file name. Only the header is parsed here; decoding and resizing happen
+    on the worker pool. Re-uploading a picture we already have costs nothing.
+    """
+    data = upload.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise InvalidImage(image.format)
+            keeps_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+    except (UnidentifiedImageError, OSError) as exc:
+        raise InvalidImage(str(exc)) from exc
+
+    image_file = digest + ('.png' if keeps_alpha else '.jpg')
+    if not all(os.path.exists(os.path.join(PROFILE_PICS, name)) for name in _variants(image_file)):
+        executor.submit(_process, data, image_file)
+    return image_file
+
+
+def _process(data, image_file):
+    digest, ext = os.path.splitext(image_file)
+    try:
+        with Image.open(BytesIO(data)) as source:
+            source.load()
+            source = source.convert('RGBA' if ext == '.png' else 'RGB')
+            # Largest first: image_file itself is written last, so once it exists
+            # every other variant does too
+            for size in reversed(SIZES):
+                image = source.copy()
+                image.thumbnail((size, size))
+                _write(image, _variant(digest, size, '.webp'), 'WEBP', quality=85)
+                _write(image, _variant(digest, size, ext), 'PNG' if ext == '.png' else 'JPEG',
+                       **({'optimize': True} if ext == '.png' else {'quality': 90}))
+    except Exception:
+        app.logger.exception('Processing profile picture %s failed', image_file)
+
+
+def _write(image, name, image_format, **options):
+    # Write under a temporary name and rename, so readers never see a partial file
+    path = os.path.join(PROFILE_PICS, name)
+    if os.path.exists(path):
+        return
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    image.save(tmp_path, image_format, **options)
+    os.replace(tmp_path, path)
+
+
+def is_ready(image_file):
+    return os.path.exists(os.path.join(PROFILE_PICS, image_file))
+
+
+@app.template_global()
+def avatar(image_file, size=SIZES[0]):
+    """URLs for a profile picture: 'src', 'srcset' and 'webp_srcset' (high-DPI variants
+    included). Pictures still being processed fall back to the default one."""
+    if not image_file or image_file == DEFAULT_PICTURE or not is_ready(image_file):
+        src = url_for('static', filename='profile_pics/' + DEFAULT_PICTURE)
+        return {'src': src, 'srcset': src, 'webp_srcset': None}
+    digest, ext = os.path.splitext(image_file)
+    if not is_ready(_variant(digest, SIZES[-1], '.webp')):
+        # Uploaded before variants existed: only the single file is there
+        src = url_for('static', filename='profile_pics/' + image_file)
+        return {'src': src, 'srcset': src, 'webp_srcset': None}
+    urls = {}
+    for variant_ext in (ext, '.webp'):
+        urls[variant_ext] = ', '.join(
+            f"{url_for('static', filename='profile_pics/' + _variant(digest, variant_size, variant_ext))} {variant_size // size}x"
+            for variant_size in SIZES if variant_size >= size and variant_size % size == 0
+        )
+    return {
+        'src': url_for('static', filename='profile_pics/' + _variant(digest, size, ext)),
+        'srcset': urls[ext],
+        'webp_srcset': urls['.webp'],
+    }
+
+
+def collect(grace_seconds=GC_GRACE_SECONDS):
+    """Delete picture files that no user refers to. Returns the number removed."""
+    from flaskapp.models import User
+
+    referenced = {DEFAULT_PICTURE}
+    for (image_file,) in db.session.query(User.image_file).distinct():
+        referenced.update(_variants(image_file))
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for entry in os.scandir(PROFILE_PICS):
+        if entry.name in referenced or not entry.is_file():
+            continue
+        if entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+@app.after_request
+def cache_profile_pictures(response):
+    # Content-addressed files never change, so browsers may keep them forever
+    if request.endpoint == 'static' and response.status_code == 200:
+        filename = (request.view_args or {}).get('filename', '')
+        if filename.startswith('profile_pics/') and filename != 'profile_pics/' + DEFAULT_PICTURE:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+    return response
+
+
+@app.cli.command('images-gc')
+@click.option('--grace', default=GC_GRACE_SECONDS, show_default=True, help='Keep files younger than this many seconds.')
+def images_gc_command(grace):
+    """Delete profile picture files that no user refers to."""
+    click.echo(f'Removed {collect(grace_seconds=grace)} unreferenced picture files.')
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flaskapp import app, db
+from flaskapp.models import Service, ServiceProvider, Order, Category
+
+TOP_N = 3
+
+LeaderboardEntry = namedtuple('LeaderboardEntry', ['id', 'title', 'description', 'ratings', 'ser_price', 'order_count'])
+
+_lock = threading.Lock()
+# (top_n, computed at, result)
+_cache = None
+_generation = 0
+
+
+def _compute(top_n):
+    order_count = db.func.count(Order.id)
+    ranked = (
+        db.select(
+            Service.id.label('service_id'),
+            order_count.label('order_count'),
+            db.func.row_number().over(
+                partition_by=Service.category_id,
+                order_by=(order_count.desc(), Service.id),
+            ).label('rank'),
+        )
+        .select_from(Service)
+        .join(ServiceProvider, Service.provider_id == ServiceProvider.id)
+        .outerjoin(Order, Order.ser_id == Service.id)
+        .where(ServiceProvider.verified == True)
+        .group_by(Service.id)
+        .subquery()
+    )
+
+    rows = db.session.execute(
+        db.select(
+            Category.name,
+            Service.id,
+            Service.title,
+            Service.description,
+            Service.ratings,
+            Service.ser_price,
+            ranked.c.order_count,
+        )
+        .join(Service, Service.id == ranked.c.service_id)
+        .join(Category, Category.id == Service.category_id)
+        .where(ranked.c.rank <= top_n)
+        .order_by(Category.name, ranked.c.rank)
+    ).all()
+
+    services_by_category = {}
+    category_order_counts = {}
+    for category_name, *fields in rows:
+        entry = LeaderboardEntry(*fields)
+        services_by_category.setdefault(category_name, []).append(entry)
+        category_order_counts[category_name] = category_order_counts.get(category_name, 0) + entry.order_count
+
+    # Sort categories by the number of orders
+    sorted_categories = sorted(category_order_counts.items(), key=lambda item: item[1], reverse=True)
+    return {category: tuple(services_by_category[category]) for category, _ in sorted_categories}
+
+
+def top_services_by_category(top_n=TOP_N):
+    """Recomputed after a relevant commit in this process, or once it is older than
+    LEADERBOARD_TTL seconds, which picks up other processes' orders."""
+    global _cache
+    with _lock:
+        if _cache is not None and _cache[0] == top_n and time.monotonic() - _cache[1] < app.config['LEADERBOARD_TTL']:
+            return _cache[2]
+        generation = _generation
+
+    computed_at = time.monotonic()
+    result = _compute(top_n)
+
+    with _lock:
+        # Only publish if nothing was invalidated while we were computing
+        if generation == _generation:
+            _cache = (top_n, computed_at, result)
+    return result
+
+
+def invalidate():
+    global _cache, _generation
+    with _lock:
+        _cache = None
+        _generation += 1
+
+
+def _affects_leaderboard(session):
+    for obj in session.new:
+        if isinstance(obj, (Order, Service, ServiceProvider, Category)):
+            return True
+    for obj in session.deleted:
+        if isinstance(obj, (Order, Service, ServiceProvider, Category)):
+            return True
+    for obj in session.dirty:
+        # Order edits (status, reviews) never change order counts
+        if isinstance(obj, (Service, ServiceProvider, Category)) and session.is_modified(obj):
+            return True
+    return False
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_dirty(session, flush_context):
+    if _affects_leaderboard(session):
+        session.info['leaderboard_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('leaderboard_dirty', False):
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('leaderboard_dirty', None)
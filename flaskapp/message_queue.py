@@ -0,0 +1,86 @@
+import pickle
+import sqlite3
+import threading
+import time
+import socketio
+
+SQLITE_PREFIX = 'sqlite:///'
+
+
+class SQLiteManager(socketio.PubSubManager):
+    """Socket.IO client manager that relays events between processes through a
+    shared SQLite file, for running several workers on one machine without a broker.
+
+    Every emit, room change and disconnect is appended to the socketio_message
+    table. Each process polls the table for rows newer than the last one it saw
+    and replays the ones published by other processes. Rows older than
+    retention seconds are pruned by the publishers.
+    """
+    name = 'sqlite'
+
+    def __init__(self, url='sqlite:///socketio-queue.db', channel='flask-socketio', write_only=False,
+                 logger=None, poll_interval=0.02, retention=60):
+        if not url.startswith(SQLITE_PREFIX):
+            raise ValueError(f'unexpected message queue url: {url}')
+        self.path = url[len(SQLITE_PREFIX):]
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        self._last_prune = 0.0
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        with self._connection() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS socketio_message (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                created REAL NOT NULL
+            )""")
+
+    def _connection(self):
+        # One connection per thread; sqlite3 connections must not be shared between them
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _publish(self, data):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO socketio_message (channel, payload, created) VALUES (?, ?, ?)",
+                (self.channel, pickle.dumps(data), now),
+            )
+            if now - self._last_prune > self.retention:
+                self._last_prune = now
+                connection.execute("DELETE FROM socketio_message WHERE created < ?", (now - self.retention,))
+
+    def _listen(self):
+        connection = self._connection()
+        # Only events published after this process started are relayed
+        last_id = connection.execute("SELECT coalesce(max(id), 0) FROM socketio_message").fetchone()[0]
+        while True:
+            rows = connection.execute(
+                "SELECT id, payload FROM socketio_message WHERE id > ? AND channel = ? ORDER BY id",
+                (last_id, self.channel),
+            ).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                yield pickle.loads(payload)
+            if not rows:
+                self.server.sleep(self.poll_interval)
+
+
+def socketio_options(url):
+    """Keyword arguments for SocketIO() given the SOCKETIO_MESSAGE_QUEUE setting.
+
+    sqlite:/// URLs use SQLiteManager; anything else (redis://, amqp://, kafka://,
+    zmq+tcp://) is handed to Flask-SocketIO, and no URL keeps a single-process server.
+    """
+    if not url:
+        return {}
+    if url.startswith(SQLITE_PREFIX):
+        return {'client_manager': SQLiteManager(url)}
+    return {'message_queue': url}
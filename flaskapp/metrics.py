@@ -0,0 +1,184 @@
+import bisect
+import functools
+import threading
+import time
+from flask import request
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+# Default latency buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """With a callback, the value is read from it at scrape time instead; the callback
+    returns a number, or a dict of label value tuples to numbers."""
+    kind = None
+
+    def __init__(self, name, help, labels=(), callback=None):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def samples(self):
+        if self.callback is not None:
+            value = self.callback()
+            values = value if isinstance(value, dict) else {(): value}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [(self.name, _labels(self.label_names, key), value) for key, value in sorted(values.items())]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name}{labels} {_number(value)}' for name, labels, value in self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the running sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        samples = []
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', _labels(self.label_names, key, [('le', _number(bound))]), cumulative))
+            samples.append((f'{self.name}_sum', _labels(self.label_names, key), counts[-1]))
+            samples.append((f'{self.name}_count', _labels(self.label_names, key), cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'metric {metric.name} already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=(), callback=None):
+        return self._register(Counter(name, help, labels, callback))
+
+    def gauge(self, name, help, labels=(), callback=None):
+        return self._register(Gauge(name, help, labels, callback))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+db_pool_wait = registry.histogram(
+    'db_pool_wait_seconds', 'Time spent waiting for a database connection from the pool.',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+db_pool_timeouts = registry.counter('db_pool_timeouts_total', 'Connection checkouts that gave up waiting.')
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a free connection
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            db_pool_timeouts.inc()
+            raise
+        finally:
+            db_pool_wait.observe(time.perf_counter() - start)
+
+
+socketio_events = registry.counter('socketio_events_total', 'Socket.IO events handled.', ('event',))
+socketio_latency = registry.histogram('socketio_event_duration_seconds', 'Socket.IO event handler latency.', ('event',))
+socketio_emits = registry.counter('socketio_emits_total', 'Socket.IO events sent to clients.', ('event',))
+
+
+def timed_event(handler):
+    """Count and time a Socket.IO event handler; goes under @socketio.on."""
+    @functools.wraps(handler)
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return handler(*args)
+        finally:
+            name = request.event['message']
+            socketio_events.inc(event=name)
+            socketio_latency.observe(time.perf_counter() - start, event=name)
+    return wrapper
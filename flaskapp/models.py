@@ -1,14 +1,39 @@
 from datetime import datetime
+from collections import namedtuple
 from flaskapp import db, login_manager
+from flaskapp.identity_cache import identity_cache
 from flask_login import UserMixin
+from sqlalchemy.ext.hybrid import hybrid_property
 from enum import Enum
-from flask_bcrypt import Bcrypt
 
-bcrypt = Bcrypt()
+Roles = namedtuple('Roles', ['provider', 'verified_provider', 'admin'])
+
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 5
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        snapshot, verified = cached
+        user = db.session.merge(snapshot, load=False)
+        user.set_roles(verified)
+        return user
+
+    # Load the user and their provider row together so role checks need no extra queries
+    row = (
+        db.session.query(User, ServiceProvider.verified)
+        .outerjoin(ServiceProvider, ServiceProvider.id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    user, verified = row
+    user.set_roles(verified)
+    identity_cache.put(user_id, user, verified)
+    return user
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -19,15 +44,49 @@ class User(db.Model, UserMixin):
     orders = db.relationship('Order', backref='customer', lazy=True)
     is_admin = db.Column(db.Boolean, nullable=False, default=False)
     services = db.relationship('Service', backref='creator', lazy=True)
+    # Notifications with an id above the read cursor are unread; the counter mirrors
+    # their number so the navbar badge needs no query
+    last_read_notification_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def roles(self):
+        # Resolved once per loaded instance, i.e. once per request for current_user
+        roles = self.__dict__.get('_roles')
+        if roles is None:
+            verified = db.session.query(ServiceProvider.verified).filter_by(id=self.id).scalar()
+            roles = self.set_roles(verified)
+        return roles
+
+    def set_roles(self, provider_verified):
+        # provider_verified is None when the user has no ServiceProvider row
+        self._roles = Roles(
+            provider=provider_verified is not None,
+            verified_provider=bool(provider_verified),
+            admin=bool(self.is_admin),
+        )
+        return self._roles
+
+    def refresh_roles(self):
+        self.__dict__.pop('_roles', None)
 
     @property
     def is_service_provider(self):
-        return ServiceProvider.query.filter_by(id=self.id).first() is not None
+        return self.roles.provider
+
+    @property
+    def is_verified_provider(self):
+        return self.roles.verified_provider
 
     def __repr__(self):
         return f"User('{self.username}', '{self.email}', '{self.image_file}')"
 
 class ServiceProvider(db.Model):
+    __table_args__ = (
+        # Admin queue of providers awaiting verification
+        db.Index('ix_service_provider_verified', 'verified'),
+    )
+
     id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
     nid = db.Column(db.String(50), unique=True, nullable=False)
     bio = db.Column(db.Text, nullable=True)
@@ -54,6 +113,15 @@ class Category(db.Model):
         return f"Category('{self.name}')"
 
 class Service(db.Model):
+    __table_args__ = (
+        # Category filter of the nearby-provider search
+        db.Index('ix_service_provider_id_category_id', 'provider_id', 'category_id'),
+        # Top-rated service of each category on the home page
+        db.Index('ix_service_category_id_ratings', 'category_id', 'ratings'),
+        # Newest-first admin service list
+        db.Index('ix_service_date_posted', 'date_posted'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -61,6 +129,9 @@ class Service(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     provider_id = db.Column(db.Integer, db.ForeignKey('service_provider.id'), nullable=False)
     ratings = db.Column(db.Integer, nullable=False)
+    # Running totals of Order.rate, maintained by flaskapp.ratings when a review is written
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
     duration = db.Column(db.Integer, nullable=False)
     ser_price = db.Column(db.Float, nullable=False)
@@ -69,6 +140,15 @@ class Service(db.Model):
     def __repr__(self):
         return f'<Service {self.id}, Title: {self.title}, Category: {self.category.name}, Date: {self.date_posted}>'
 
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @hybrid_property
+    def bayesian_rating(self):
+        # Mean pulled towards RATING_PRIOR_MEAN until a service has collected enough reviews
+        return (RATING_PRIOR_WEIGHT * RATING_PRIOR_MEAN + self.rating_sum) / (RATING_PRIOR_WEIGHT + self.rating_count)
+
     def set_ratings(self, value):
         if 0 <= value <= 5:
             self.ratings = value
@@ -87,7 +167,26 @@ class NotificationStatus(Enum):
     not_viewed = 'not viewed'
     viewed = 'viewed'
 
+class NotificationKind(Enum):
+    order = 'order'
+    refund = 'refund'
+    warning = 'warning'
+    status = 'order update'
+    general = 'general'
+
 class Order(db.Model):
+    __table_args__ = (
+        # Newest-first review feed of a service, optionally narrowed to one star rating
+        db.Index('ix_order_ser_id_order_datetime', 'ser_id', 'order_datetime'),
+        db.Index('ix_order_ser_id_rate_order_datetime', 'ser_id', 'rate', 'order_datetime'),
+        # A customer's order history, newest first
+        db.Index('ix_order_customer_id_order_datetime', 'customer_id', 'order_datetime'),
+        # A provider's orders in one or more statuses, newest first
+        db.Index('ix_order_service_provider_id_status_order_datetime', 'service_provider_id', 'status', 'order_datetime'),
+        # Active orders per provider, counted by dispatch
+        db.Index('ix_order_status_service_provider_id', 'status', 'service_provider_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     order_loc = db.Column(db.String(200), nullable=False)
     order_datetime = db.Column(db.DateTime, default=datetime.utcnow)
@@ -107,6 +206,12 @@ class Order(db.Model):
         return f'<Order {self.id}, Location: {self.order_loc}, Price: {self.price}, Status: {self.status.value}, Notifications: {self.notifications.value}>'
 
 class Complaint(db.Model):
+    __table_args__ = (
+        # Admin complaint queues, newest first
+        db.Index('ix_complaint_resolved_date_posted', 'resolved', 'date_posted'),
+        db.Index('ix_complaint_order_id', 'order_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -122,161 +227,53 @@ class Complaint(db.Model):
         return f"Complaint('{self.id}', '{self.date_posted}', '{self.message}')"
 
 class Notification(db.Model):
+    __table_args__ = (
+        db.Index('ix_notification_user_id_date_posted', 'user_id', 'date_posted'),
+        db.Index('ix_notification_order_id', 'order_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.Enum(NotificationKind), nullable=False, default=NotificationKind.general, server_default=NotificationKind.general.name)
     message = db.Column(db.String(255), nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Set for order alerts so the feed can show the order without another query
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
 
     user = db.relationship('User', backref='notifications', lazy=True)
+    order = db.relationship('Order', lazy=True)
 
     def __repr__(self):
         return f"Notification('{self.id}', '{self.message}', '{self.date_posted}')"
 
+class ChatMessage(db.Model):
+    __table_args__ = (
+        # History is read newest first per order room
+        db.Index('ix_chat_message_order_id_id', 'order_id', 'id'),
+    )
 
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    def __repr__(self):
+        return f"ChatMessage('{self.order_id}', '{self.user_id}', '{self.created_at}')"
 
+class ProviderDailyStats(db.Model):
+    # Per provider, service and day counters kept up to date by flaskapp.analytics
+    __tablename__ = 'provider_daily_stats'
+    provider_id = db.Column(db.Integer, db.ForeignKey('service_provider.id'), primary_key=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('service.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    # Customers whose first order with this provider falls on this row
+    new_customers = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    complaints = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-def create_dummy_data():
-    from flaskapp import db
-    from flaskapp.models import User, ServiceProvider, Service, Order, Category, Complaint, Notification
-    from datetime import datetime
-    import random
-
-    # Bengali names for users
-    bengali_names = [
-        'Arjun', 'Amit', 'Bijoy', 'Chandan', 'Dipak', 'Esha', 'Farhan', 'Gopal', 'Harun', 'Ishita',
-        'Jahid', 'Kabir', 'Liton', 'Mithun', 'Nadia', 'Omar', 'Puja', 'Quazi', 'Rana', 'Sima',
-        'Tuhin', 'Usha', 'Vikram', 'Wahid', 'Xavier', 'Yasmin', 'Zahid', 'Anika', 'Bithi', 'Chitra',
-        'Debashish', 'Elina', 'Fahim', 'Gita', 'Hassan', 'Indira', 'Joya', 'Kamal', 'Laila', 'Mona',
-        'Nafisa', 'Oishi', 'Parvez', 'Quamrul', 'Rafiq', 'Shima', 'Tanvir', 'Uday', 'Vivek', 'Wasim'
-    ]
-
-    # Create dummy users
-    users = []
-    for i in range(1, 51):
-        hashed_password = bcrypt.generate_password_hash('password').decode('utf-8')
-        user = User(username=bengali_names[i-1], email=f'{bengali_names[i-1].lower()}@example.com', password=hashed_password, is_admin=(i == 1))
-        users.append(user)
-    db.session.add_all(users)
-    db.session.commit()
-
-    # Create dummy service providers
-    service_providers = []
-    for i in range(1, 51):
-        sp = ServiceProvider(
-            id=users[i-1].id, 
-            nid=f'{random.randint(100000000, 999999999)}', 
-            bio=f'Service Provider {bengali_names[i-1]} Bio', 
-            verified=bool(random.getrandbits(1)), 
-            latitude=random.uniform(20.0, 26.0), 
-            longitude=random.uniform(88.0, 92.0)
-        )
-        service_providers.append(sp)
-    db.session.add_all(service_providers)
-    db.session.commit()
-
-    # Actual names for categories
-    category_names = ['Cleaning', 'Plumbing', 'Electrical', 'Carpentry', 'Painting']
-    categories = [Category(name=name) for name in category_names]
-    db.session.add_all(categories)
-    db.session.commit()
-
-    # Real service names matching categories
-    service_names = {
-        'Cleaning': ['House Cleaning', 'Office Cleaning', 'Window Cleaning', 'Carpet Cleaning', 'Deep Cleaning'],
-        'Plumbing': ['Leak Repair', 'Drain Cleaning', 'Pipe Installation', 'Water Heater Repair', 'Toilet Repair'],
-        'Electrical': ['Wiring Installation', 'Light Fixture Installation', 'Electrical Repair', 'Circuit Breaker Replacement', 'Outlet Installation'],
-        'Carpentry': ['Furniture Assembly', 'Cabinet Installation', 'Deck Building', 'Door Installation', 'Trim Work'],
-        'Painting': ['Interior Painting', 'Exterior Painting', 'Wallpaper Removal', 'Fence Painting', 'Deck Staining']
-    }
-
-    # Create dummy services
-    services = []
-    for i in range(1, 51):
-        category = random.choice(categories)
-        service = Service(
-            title=random.choice(service_names[category.name]), 
-            description=f'{category.name} service description', 
-            user_id=users[i-1].id, 
-            provider_id=service_providers[i-1].id, 
-            ratings=random.randint(1, 5), 
-            category_id=category.id, 
-            duration=random.randint(1, 5), 
-            ser_price=random.randint(10, 100)  # Ensure ser_price is an integer
-        )
-        services.append(service)
-    db.session.add_all(services)
-    db.session.commit()
-
-    # Names of locations in Bangladesh
-    bangladesh_locations = [
-        'Dhaka', 'Chittagong', 'Khulna', 'Rajshahi', 'Sylhet', 'Barisal', 'Rangpur', 'Comilla', 'Narayanganj', 'Gazipur',
-        'Mymensingh', 'Cox\'s Bazar', 'Jessore', 'Nawabganj', 'Bogra', 'Dinajpur', 'Pabna', 'Tangail', 'Kushtia', 'Faridpur',
-        'Noakhali', 'Feni', 'Brahmanbaria', 'Patuakhali', 'Jamalpur', 'Netrakona', 'Sherpur', 'Sunamganj', 'Habiganj', 'Maulvibazar',
-        'Lakshmipur', 'Chandpur', 'Kishoreganj', 'Manikganj', 'Munshiganj', 'Narsingdi', 'Shariatpur', 'Madaripur', 'Gopalganj', 'Jhalokathi',
-        'Barguna', 'Bhola', 'Pirojpur', 'Bandarban', 'Khagrachari', 'Rangamati', 'Bagerhat', 'Satkhira', 'Magura', 'Meherpur'
-    ]
-
-    # Create dummy orders
-    orders = []
-    for i in range(1, 51):
-        order = Order(
-            order_loc=random.choice(bangladesh_locations), 
-            order_datetime=datetime.utcnow(), 
-            status=random.choice(list(OrderStatus)), 
-            price=random.uniform(10.0, 100.0), 
-            ser_id=services[i-1].id, 
-            service_provider_id=service_providers[i-1].id, 
-            customer_id=random.choice(users).id, 
-            latitude=random.uniform(20.0, 26.0), 
-            longitude=random.uniform(88.0, 92.0)
-        )
-        orders.append(order)
-    db.session.add_all(orders)
-    db.session.commit()
-
-    # Create dummy complaints
-    complaints = []
-    for i in range(1, 51):
-        complaint = Complaint(
-            order_id=random.choice(orders).id, 
-            user_id=random.choice(users).id, 
-            message=f'Complaint {i} message', 
-            date_posted=datetime.utcnow(), 
-            resolved=bool(random.getrandbits(1))
-        )
-        complaints.append(complaint)
-    db.session.add_all(complaints)
-    db.session.commit()
-
-    # Create dummy notifications
-    notifications = []
-    for i in range(1, 51):
-        notification = Notification(
-            user_id=random.choice(users).id, 
-            message=f'Notification {i} message', 
-            date_posted=datetime.utcnow()
-        )
-        notifications.append(notification)
-    db.session.add_all(notifications)
-    db.session.commit()
-
-    print("Dummy data created successfully!")
\ No newline at end of file
+    def __repr__(self):
+        return f"ProviderDailyStats('{self.provider_id}', '{self.service_id}', '{self.day}', Orders: {self.orders})"
@@ -0,0 +1,95 @@
+import hmac
+import time
+from flask import g, request, abort, Response
+from flaskapp import app, db, socketio
+from flaskapp.metrics import registry
+from flaskapp.chat import chat_buffer
+from flaskapp.passwords import password_hasher
+from flaskapp.response_cache import response_cache
+
+START_TIME = time.time()
+
+http_requests = registry.counter('http_requests_total', 'HTTP requests by endpoint and status.', ('method', 'endpoint', 'status'))
+http_latency = registry.histogram('http_request_duration_seconds', 'HTTP request latency.', ('method', 'endpoint'))
+http_in_flight = registry.gauge('http_requests_in_flight', 'HTTP requests being served.')
+
+
+def _pool_stat(name):
+    def read():
+        with app.app_context():
+            engines = db.engines
+        return {(key or 'default',): getattr(engine.pool, name)() for key, engine in engines.items()
+                if hasattr(engine.pool, name)}
+    return read
+
+
+def _socketio_rooms():
+    # Rooms are kept per process; each process reports its own clients
+    manager = socketio.server.manager
+    clients = 0
+    rooms = {}
+    for namespace, namespace_rooms in manager.rooms.items():
+        for room, participants in namespace_rooms.items():
+            if room is None:
+                clients += len(participants)
+            elif isinstance(room, str) and '_' in room:
+                kind = room.split('_', 1)[0]
+                rooms[(kind,)] = rooms.get((kind,), 0) + 1
+    return clients, rooms
+
+
+def _response_cache_lookups():
+    stats = response_cache.stats()
+    return {('hit',): stats['hits'], ('miss',): stats['misses'], ('bypass',): stats['bypasses']}
+
+
+registry.gauge('db_pool_checked_out', 'Database connections in use.', ('engine',), callback=_pool_stat('checkedout'))
+registry.gauge('db_pool_size', 'Database connections the pool keeps open.', ('engine',), callback=_pool_stat('size'))
+registry.gauge('socketio_connected_clients', 'Socket.IO clients connected to this process.',
+               callback=lambda: _socketio_rooms()[0])
+registry.gauge('socketio_rooms', 'Occupied Socket.IO rooms by kind (order chats, user notification rooms).', ('kind',),
+               callback=lambda: _socketio_rooms()[1])
+registry.gauge('chat_messages_pending', 'Chat messages waiting in the write-behind buffer.',
+               callback=lambda: chat_buffer.stats()['pending'])
+registry.counter('password_hash_rejections_total', 'Sign-ins turned away because the hashing pool was full.',
+               callback=lambda: password_hasher.rejected)
+registry.counter('response_cache_lookups_total', 'Cacheable page requests by outcome.', ('result',),
+               callback=_response_cache_lookups)
+registry.gauge('process_start_time_seconds', 'Start time of the process since the epoch.', callback=lambda: START_TIME)
+
+
+def _endpoint():
+    # Unmatched URLs share one label, so scanners cannot blow up the series count
+    return request.endpoint or 'unmatched'
+
+
+@app.before_request
+def start_request_timer():
+    g.metrics_start = time.perf_counter()
+    http_in_flight.inc()
+
+
+@app.after_request
+def count_response(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def record_request(exc):
+    # Also runs after Socket.IO events, which never went through before_request
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return
+    http_in_flight.dec()
+    status = g.pop('metrics_status', 500)
+    http_requests.inc(method=request.method, endpoint=_endpoint(), status=status)
+    http_latency.observe(time.perf_counter() - start, method=request.method, endpoint=_endpoint())
+
+
+@app.route('/metrics')
+def metrics():
+    token = app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,111 @@
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flask_login import current_user
+from flask_socketio import join_room
+from flaskapp import db, socketio
+from flaskapp.identity_cache import identity_cache
+from flaskapp.metrics import socketio_emits
+from flaskapp.models import User, Notification
+
+
+def user_room(user_id):
+    return f'user_{user_id}'
+
+
+def notify(user_id, kind, message, order_id=None):
+    """Queue a notification for user_id in the caller's transaction.
+
+    The recipient's unread counter is bumped in the same transaction, and the
+    notification is pushed to their Socket.IO room once it commits.
+    """
+    notification = Notification(user_id=user_id, kind=kind, message=message[:255], order_id=order_id)
+    db.session.add(notification)
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user_id)
+        .values(unread_notifications=User.unread_notifications + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return notification
+
+
+def notify_many(items):
+    """Queue several notifications at once; items are (user_id, kind, message, order_id)
+    tuples. Each recipient's counter is bumped by one executemany UPDATE."""
+    created = [Notification(user_id=user_id, kind=kind, message=message[:255], order_id=order_id)
+               for user_id, kind, message, order_id in items]
+    if not created:
+        return created
+    db.session.add_all(created)
+    per_user = Counter(notification.user_id for notification in created)
+    users = User.__table__
+    db.session.execute(
+        users.update()
+        .where(users.c.id == db.bindparam('recipient'))
+        .values(unread_notifications=users.c.unread_notifications + db.bindparam('added')),
+        [{'recipient': user_id, 'added': added} for user_id, added in per_user.items()],
+    )
+    return created
+
+
+def mark_read(user, through):
+    """Advance the user's read cursor to notification id `through`, the newest one the
+    page they saw showed, and recount the unread ones past it in the same UPDATE, so one
+    notified meanwhile stays unread."""
+    # SQLite's two-argument max()
+    cursor = db.func.max(User.last_read_notification_id, through)
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user.id)
+        .values(
+            last_read_notification_id=cursor,
+            unread_notifications=db.select(db.func.count(Notification.id))
+            .where(Notification.user_id == User.id, Notification.id > cursor)
+            .scalar_subquery(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    identity_cache.invalidate(user.id)
+
+
+def _payload(notification):
+    return {
+        'id': notification.id,
+        'kind': notification.kind.value,
+        'message': notification.message,
+        'date_posted': notification.date_posted.isoformat(),
+        'order_id': notification.order_id,
+    }
+
+
+# Pushes wait for the commit so clients never hear about a notification that was rolled back
+@event.listens_for(Session, 'after_flush')
+def _collect_notifications(session, flush_context):
+    created = [obj for obj in session.new if isinstance(obj, Notification)]
+    if created:
+        session.info.setdefault('notifications_created', []).extend(_payload(n) | {'user_id': n.user_id} for n in created)
+
+
+@event.listens_for(Session, 'after_commit')
+def _push_notifications(session):
+    created = session.info.pop('notifications_created', None)
+    if not created:
+        return
+    # The unread counter lives on the user row, so cached identities are stale now
+    identity_cache.invalidate(*{payload['user_id'] for payload in created})
+    for payload in created:
+        socketio.emit('notification', payload, to=user_room(payload.pop('user_id')))
+        socketio_emits.inc(event='notification')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_notifications(session):
+    session.info.pop('notifications_created', None)
+
+
+@socketio.on('connect')
+def join_user_room():
+    if current_user.is_authenticated:
+        join_room(user_room(current_user.id))
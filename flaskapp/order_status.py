@@ -0,0 +1,92 @@
+from collections import namedtuple
+from flaskapp import db, notifications, dispatch
+from flaskapp.response_cache import bump_on_commit
+from flaskapp.models import Order, Service, OrderStatus, NotificationStatus, NotificationKind
+
+# The statuses a provider may move an order to from each status
+TRANSITIONS = {
+    OrderStatus.pending: {OrderStatus.accepted, OrderStatus.rejected},
+    OrderStatus.accepted: {OrderStatus.on_the_way},
+    OrderStatus.on_the_way: {OrderStatus.reached},
+    OrderStatus.reached: {OrderStatus.completed},
+}
+
+# Bounds the IN lists and the transaction a single request can hold open
+MAX_CHANGES = 500
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+ILLEGAL = 'illegal_transition'
+# The order changed status between our read and the guarded UPDATE
+CONFLICT = 'conflict'
+
+TransitionResult = namedtuple('TransitionResult', ['order_id', 'outcome', 'from_status', 'to_status'])
+
+
+def parse_status(value):
+    if isinstance(value, OrderStatus):
+        return value
+    try:
+        return OrderStatus[value]
+    except KeyError:
+        return next((status for status in OrderStatus if status.value == value), None)
+
+
+def transition_orders(provider_id, changes):
+    """Move orders of provider_id to new statuses in the caller's transaction.
+
+    changes is a list of (order_id, OrderStatus) pairs. Legal changes are applied with
+    one guarded UPDATE per (from, to) pair, the customers of updated orders are
+    notified together, and a TransitionResult is returned per requested change.
+    """
+    ids = {order_id for order_id, _ in changes}
+    current = {
+        row.id: row
+        for row in db.session.query(Order.id, Order.status, Order.service_provider_id, Order.customer_id, Order.ser_id,
+                                    Service.title)
+        .join(Service, Service.id == Order.ser_id)
+        .filter(Order.id.in_(ids))
+    } if ids else {}
+
+    results = {}
+    groups = {}
+    for order_id, target in changes:
+        row = current.get(order_id)
+        if row is None:
+            results[order_id] = TransitionResult(order_id, NOT_FOUND, None, target)
+        elif row.service_provider_id != provider_id:
+            results[order_id] = TransitionResult(order_id, FORBIDDEN, None, target)
+        elif row.status == target:
+            results[order_id] = TransitionResult(order_id, UNCHANGED, row.status, target)
+        elif target not in TRANSITIONS.get(row.status, ()):
+            results[order_id] = TransitionResult(order_id, ILLEGAL, row.status, target)
+        elif order_id not in results:
+            groups.setdefault((row.status, target), []).append(order_id)
+            results[order_id] = TransitionResult(order_id, CONFLICT, row.status, target)
+
+    alerts = []
+    for (source, target), order_ids in groups.items():
+        updated = db.session.execute(
+            db.update(Order)
+            .where(Order.id.in_(order_ids), Order.status == source, Order.service_provider_id == provider_id)
+            .values(status=target, notifications=NotificationStatus.viewed)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        for order_id in updated:
+            results[order_id] = TransitionResult(order_id, UPDATED, source, target)
+            row = current[order_id]
+            alerts.append((row.customer_id, NotificationKind.status,
+                           f'Your order for {row.title} is now {target.value}.', order_id))
+        dispatch.track_load(provider_id, len(updated) * dispatch.load_change(source, target))
+        bump_on_commit(*{f'service:{current[order_id].ser_id}' for order_id in updated})
+    notifications.notify_many(alerts)
+
+    # Orders already loaded in this session would still show their old status
+    if alerts:
+        for instance in db.session.identity_map.values():
+            if isinstance(instance, Order) and instance.id in results:
+                db.session.expire(instance, ['status', 'notifications'])
+    return [results[order_id] for order_id, _ in changes]
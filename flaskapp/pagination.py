@@ -0,0 +1,161 @@
+import base64
+import json
+from datetime import datetime
+from flask import request, url_for
+from sqlalchemy import and_, or_, false
+from flaskapp import app
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+# JSON types a cursor value may have besides an encoded datetime; anything else (lists,
+# other objects) can't be bound as a query parameter
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if set(value) != {'dt'}:
+            raise InvalidCursor(value)
+        return datetime.fromisoformat(value['dt'])
+    if not isinstance(value, SCALAR_TYPES):
+        raise InvalidCursor(value)
+    return value
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps([direction, [_encode_value(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('next', 'prev') or not isinstance(values, list):
+            raise InvalidCursor(cursor)
+        return direction, [_decode_value(value) for value in values]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def page_size(requested=None):
+    if not requested or requested < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(requested, MAX_PAGE_SIZE)
+
+
+def _is_nullable(column):
+    # Mapped columns say so; other sort expressions are taken to never be NULL
+    return getattr(getattr(column, 'expression', column), 'nullable', False) is True
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _after(column, value, descending, forward):
+    # SQLite sorts NULL before every other value
+    if descending == forward:
+        if value is None:
+            return false()
+        return or_(column < value, column.is_(None)) if _is_nullable(column) else column < value
+    return column.isnot(None) if value is None else column > value
+
+
+def _seek_condition(keys, values, forward):
+    # (k1, k2, ...) strictly after (v1, v2, ...) in the sort order given by keys:
+    # k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...  with > flipped for descending keys
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(keys, values)):
+        equal = [_equal(keys[j][0], values[j]) for j in range(i)]
+        clauses.append(and_(*equal, _after(column, value, descending, forward)))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=None):
+    """Fetch one page of ``query`` ordered by ``keys``, a list of (column, descending)
+    pairs whose last entry must be unique (normally the primary key). Returns a Page
+    whose next/prev cursors seek from the last/first row, so every page costs the
+    same however deep the client scrolls.
+    """
+    per_page = page_size(per_page)
+    direction, values = decode_cursor(cursor) if cursor else ('next', None)
+    if values is not None and len(values) != len(keys):
+        raise InvalidCursor(cursor)
+    forward = direction == 'next'
+
+    single_entity = len(query.column_descriptions) == 1
+    query = query.order_by(None).add_columns(*[column for column, _ in keys])
+    if values is not None:
+        query = query.filter(_seek_condition(keys, values, forward))
+    ordering = [column.desc() if descending == forward else column.asc() for column, descending in keys]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    n_keys = len(keys)
+    items = [row[0] if single_entity else tuple(row[:-n_keys]) for row in rows]
+    if not rows:
+        return Page(items)
+
+    first_key = list(rows[0][-n_keys:])
+    last_key = list(rows[-1][-n_keys:])
+    has_next = more if forward else True
+    has_prev = values is not None if forward else more
+    return Page(
+        items,
+        next_cursor=encode_cursor('next', last_key) if has_next else None,
+        prev_cursor=encode_cursor('prev', first_key) if has_prev else None,
+    )
+
+
+@app.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return "Invalid page cursor", 400
+
+
+@app.template_global()
+def cursor_url(cursor, cursor_arg='cursor'):
+    # Current URL with every query argument kept except the cursor being replaced
+    args = request.args.to_dict()
+    args[cursor_arg] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
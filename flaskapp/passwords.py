@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from flaskapp import app, bcrypt
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class LatencyWindow:
+    # Percentiles over the most recent samples, in milliseconds
+
+    def __init__(self, maxlen=2048):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds * 1000)
+            self.count += 1
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+        if not samples:
+            return {'count': count}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+        return {'count': count, 'p50': percentile(0.50), 'p95': percentile(0.95), 'p99': percentile(0.99), 'max': round(samples[-1], 2)}
+
+
+class PasswordHasher:
+    """bcrypt with admission control.
+
+    Hashes run on the calling thread; bcrypt releases the GIL, so up to `workers` of
+    them run in parallel. At most max_pending callers are hashing or waiting for a
+    turn; beyond that, or after waiting queue_timeout seconds for a turn, the caller
+    gets HashingBusy (a 503) instead of piling more work onto a saturated CPU.
+    """
+
+    def __init__(self, rounds, workers=4, max_pending=16, queue_timeout=0.5):
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self._turns = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.latency = {'hash': LatencyWindow(), 'check': LatencyWindow(), 'login': LatencyWindow()}
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise HashingBusy()
+
+    def _run(self, kind, fn, *args):
+        start = time.perf_counter()
+        with self._lock:
+            full = self.pending >= self.max_pending
+            if not full:
+                self.pending += 1
+        if full:
+            self._reject()
+        try:
+            if not self._turns.acquire(timeout=self.queue_timeout):
+                self._reject()
+            try:
+                return fn(*args)
+            finally:
+                self._turns.release()
+                self.latency[kind].add(time.perf_counter() - start)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def hash(self, password):
+        return self._run('hash', bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def check(self, hashed, password):
+        return self._run('check', bcrypt.check_password_hash, hashed, password)
+
+    def needs_rehash(self, hashed):
+        # bcrypt hashes look like $2b$<rounds>$<salt+digest>
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def verify_and_update(self, user, hashed, password):
+        """Check password against hashed, user's stored hash, read beforehand so no
+        database connection is held while bcrypt runs. On success rehash it in place
+        if the configured cost changed since it was stored. The caller commits."""
+        if not self.check(hashed, password):
+            return False
+        if self.needs_rehash(hashed):
+            user.password = self.hash(password)
+            with self._lock:
+                self.rehashed += 1
+        return True
+
+    @contextmanager
+    def timed(self, kind):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latency[kind].add(time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            pending, rejected, rehashed = self.pending, self.rejected, self.rehashed
+        return {
+            'rounds': self.rounds,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': pending,
+            'rejected': rejected,
+            'rehashed': rehashed,
+            'latency_ms': {kind: window.stats() for kind, window in self.latency.items()},
+        }
+
+
+password_hasher = PasswordHasher(
+    rounds=app.config['BCRYPT_LOG_ROUNDS'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+    queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+)
+
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(error):
+    return "Too many sign-ins right now, please try again in a moment.", 503, {'Retry-After': '1'}
+
@@ -0,0 +1,177 @@
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import click
+from flask import request, has_request_context
+from sqlalchemy import event, func
+from flaskapp import app, db
+from flaskapp.models import User, ServiceProvider, Service, Order, Complaint, Category
+
+# GET pages to check, per signed-in role. Placeholders are filled from the current
+# database: the busiest customer and provider, and one of their orders and services.
+ROUTES = {
+    'anonymous': [
+        '/home', '/search_result?query=cleaning',
+        '/search_result?query=cleaning&min_price=0&max_price=1000&rating=3',
+        '/service/{service_id}', '/service/{service_id}/view_reviews', '/service/{service_id}/view_reviews?stars=5',
+        '/providers/nearby?lat=23.8&lon=90.4', '/providers/nearby?lat=23.8&lon=90.4&radius=10&category={category_id}',
+    ],
+    'customer': [
+        '/home', '/alluserorders', '/userorderdetails/{customer_order_id}', '/notification',
+        '/chat/{customer_order_id}', '/chat/{customer_order_id}/history', '/payment/{customer_order_id}',
+        '/review_order/{customer_order_id}', '/account', '/placeorder/{service_id}',
+        '/dispatch/candidates?lat=23.8&lon=90.4&category={category_id}',
+    ],
+    'provider': [
+        '/home', '/notification', '/accepted_orders', '/analytics', '/analytics?bucket=month',
+        '/order/{provider_order_id}', '/containform',
+    ],
+    'admin': [
+        '/admin', '/complaint/{complaint_id}',
+        '/admin/section/unresolved_complaints', '/admin/section/resolved_complaints', '/admin/section/users',
+        '/admin/section/services', '/admin/section/unverified_providers', '/admin/section/categories',
+    ],
+}
+
+# Full scans that are fine, with the reason. Keys are endpoints; None applies everywhere.
+ALLOWED_SCANS = {
+    None: {
+        'category': 'categories are a short fixed list',
+    },
+    'admin_dashboard': {
+        'user': 'total user count',
+        'service': 'total service count',
+    },
+    'admin_section': {
+        # Newest users first walks the rowid backwards and stops after one page
+        'user': 'primary key walk with LIMIT',
+    },
+}
+
+_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(\S+)(.*)$')
+_DERIVED = re.compile(r'^\(|^anon_\d+$')
+_SCAN_INDEX = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+# First sort column of the outermost ORDER BY, which comes last in the statement
+_ORDER_BY = re.compile(r'ORDER BY (?:"?\w+"?\.)?"?(\w+)"?[^()]*$', re.S)
+
+
+def _walks_order_by(connection, row, plan, statement):
+    # The page query's outer loop reads an index whose order is the ORDER BY, so it
+    # stops after LIMIT rows instead of reading the table
+    index = _SCAN_INDEX.search(row[3])
+    order_by = _ORDER_BY.search(statement)
+    if index is None or order_by is None or ' LIMIT ' not in statement[order_by.start():]:
+        return False
+    if any(detail.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in detail for *_, detail in plan):
+        return False
+    outer = next(r for r in plan if r[1] == 0 and r[3].startswith(('SCAN', 'SEARCH')))
+    if outer is not row:
+        return False
+    columns = connection.exec_driver_sql(f'PRAGMA index_info("{index.group(1)}")').fetchall()
+    return bool(columns) and columns[0][2] == order_by.group(1)
+
+
+def _is_full_scan(connection, row, plan, statement, allowed):
+    match = _SCAN.match(row[3])
+    if not match:
+        return False
+    name, detail = match.groups()
+    if _DERIVED.match(name) or 'VIRTUAL TABLE INDEX' in detail:
+        # Subqueries get plan lines of their own; R*Tree and FTS lookups go through their index
+        return False
+    if _walks_order_by(connection, row, plan, statement):
+        return False
+    return name not in allowed
+
+
+def _samples():
+    customer_id, customer_order_id = db.session.query(Order.customer_id, func.max(Order.id)) \
+        .group_by(Order.customer_id).order_by(func.count().desc()).first() or (None, None)
+    provider_id, provider_order_id = db.session.query(Order.service_provider_id, func.max(Order.id)) \
+        .group_by(Order.service_provider_id).order_by(func.count().desc()).first() or (None, None)
+    admin_id = db.session.query(User.id).filter(User.is_admin == True).scalar()
+    service_id = db.session.query(Service.id).join(ServiceProvider).filter(ServiceProvider.verified == True) \
+        .order_by(Service.ratings.desc()).limit(1).scalar()
+    values = {
+        'customer': customer_id,
+        'provider': provider_id,
+        'admin': admin_id,
+        'customer_order_id': customer_order_id,
+        'provider_order_id': provider_order_id,
+        'service_id': service_id,
+        'category_id': db.session.query(func.min(Category.id)).scalar(),
+        'complaint_id': db.session.query(func.max(Complaint.id)).scalar(),
+    }
+    missing = [name for name, value in values.items() if value is None]
+    if missing:
+        raise click.ClickException(f'the database has no {", ".join(missing)}; fill it with "flask seed" first')
+    return values
+
+
+def collect():
+    """Request every page in ROUTES and return {(endpoint, statement): parameters}
+    for the SELECTs they ran. Call outside an app context, or every request would
+    share its g (and with it the signed-in user)."""
+    with app.app_context():
+        samples = _samples()
+        engines = list(db.engines.values())
+        db.session.remove()
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.setdefault((request.endpoint, statement), parameters)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for role, urls in ROUTES.items():
+            client = app.test_client()
+            if role != 'anonymous':
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(samples[role])
+                    session['_fresh'] = True
+            for url in urls:
+                response = client.get(url.format(**samples))
+                if response.status_code >= 400:
+                    raise click.ClickException(f'{role} GET {url} returned {response.status_code}')
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+
+def full_scans(statements):
+    """(endpoint, statement, plan line) for every full scan not in ALLOWED_SCANS."""
+    found = []
+    with app.app_context(), db.engine.connect() as connection:
+        for (endpoint, statement), parameters in statements.items():
+            allowed = dict(ALLOWED_SCANS[None], **ALLOWED_SCANS.get(endpoint, {}))
+            plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            for row in plan:
+                if _is_full_scan(connection, row, plan, statement, allowed):
+                    found.append((endpoint, statement, row[3]))
+    return found
+
+
+@app.cli.command('query-plans')
+@click.option('--verbose', is_flag=True, help='Print every statement checked.')
+def query_plans_command(verbose):
+    """Fail if a page's queries fall back to a full table scan.
+
+    Runs EXPLAIN QUERY PLAN on each SELECT the GET pages issue against the current
+    database, which should be seeded (flask seed) so every page has data to show.
+    """
+    # flask pushes an app context around every command; collect in a thread of its own,
+    # which starts without one
+    with ThreadPoolExecutor(1) as executor:
+        statements = executor.submit(collect).result()
+    if verbose:
+        for endpoint, statement in statements:
+            click.echo(f'{endpoint}: {" ".join(statement.split())}\n')
+    scans = full_scans(statements)
+    for endpoint, statement, plan in scans:
+        click.echo(f'{endpoint}: {plan}\n    {" ".join(statement.split())}\n', err=True)
+    click.echo(f'{len(statements)} statements checked, {len(scans)} full scans.')
+    if scans:
+        sys.exit(1)
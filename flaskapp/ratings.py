@@ -0,0 +1,50 @@
+import click
+from sqlalchemy import case
+from flaskapp import app, db
+from flaskapp.response_cache import bump_on_commit
+from flaskapp.models import Service, Order
+
+
+def _rounded_mean(rating_sum, rating_count):
+    return case(
+        (rating_count > 0, db.cast(db.func.round(rating_sum * 1.0 / rating_count), db.Integer)),
+        else_=Service.ratings,
+    )
+
+
+def record_rating(service, old_rate, new_rate):
+    """Fold a review into the service's rating aggregates in the caller's transaction.
+
+    The new values are SQL expressions, so the UPDATE is applied relative to what is
+    stored at flush time and concurrent reviews of the same service can't overwrite
+    each other. old_rate is the order's previous rating when a review is edited.
+    """
+    delta = (new_rate or 0) - (old_rate or 0)
+    added = (new_rate is not None) - (old_rate is not None)
+    rating_sum = Service.rating_sum + delta
+    rating_count = Service.rating_count + added
+    service.rating_sum = rating_sum
+    service.rating_count = rating_count
+    # Service.ratings stays the rounded mean so existing filters and sorts keep working
+    service.ratings = _rounded_mean(rating_sum, rating_count)
+
+
+def backfill():
+    rating_sum = db.select(db.func.coalesce(db.func.sum(Order.rate), 0)).where(Order.ser_id == Service.id).scalar_subquery()
+    rating_count = db.select(db.func.count(Order.rate)).where(Order.ser_id == Service.id).scalar_subquery()
+    result = db.session.execute(
+        db.update(Service).values(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            ratings=_rounded_mean(rating_sum, rating_count),
+        ).execution_options(synchronize_session=False)
+    )
+    bump_on_commit('catalog')
+    db.session.commit()
+    return result.rowcount
+
+
+@app.cli.command('ratings-backfill')
+def ratings_backfill_command():
+    """Recompute every service's rating aggregates from its orders."""
+    click.echo(f'Rebuilt rating aggregates for {backfill()} services.')
@@ -0,0 +1,181 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import request, session, make_response, Response
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from flaskapp import app, db
+
+
+class ResponseCache:
+    """Bounded LRU of rendered pages. Each entry expires after its route's ttl (at most
+    max_ttl), and as soon as one of the version keys it was rendered under is bumped.
+
+    Versions are bumped by this process's commits only; the ttl bounds how long a
+    write made by another process takes to show.
+    """
+
+    def __init__(self, maxsize=1024, max_ttl=60):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def versions(self, names):
+        with self._lock:
+            return tuple(self._versions.get(name, 0) for name in names)
+
+    def bump(self, *names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get(self, key, names):
+        with self._lock:
+            entry = self._entries.get(key)
+            current = tuple(self._versions.get(name, 0) for name in names)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != current:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def put(self, key, versions, ttl, page):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + min(ttl, self.max_ttl), versions, page)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypasses': self.bypasses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache(maxsize=app.config['RESPONSE_CACHE_SIZE'], max_ttl=app.config['RESPONSE_CACHE_TTL'])
+
+
+def _viewer():
+    # The layout shows the navigation for the signed-in user's roles and their unread count.
+    # Having the count in the key means the Core UPDATEs of the counter need no bump.
+    if not current_user.is_authenticated:
+        return None
+    return current_user.id, current_user.roles, current_user.unread_notifications
+
+
+def cached_page(ttl, versions=(), vary=()):
+    """Serve a GET view from response_cache, with a strong ETag and 304 replies to a
+    matching If-None-Match. versions are version key names, formatted with the view
+    arguments ('service:{service_id}'); vary names request headers the page uses.
+
+    Pages are cached per signed-in user, and not at all while a flashed message is
+    waiting to be shown; the view itself must not flash.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            if request.method != 'GET' or session.get('_flashes'):
+                response_cache.bypass()
+                return view(**view_args)
+            names = tuple(name.format(**view_args) for name in versions)
+            key = (request.endpoint, request.full_path, _viewer()) + tuple(request.headers.get(header) for header in vary)
+            page = response_cache.get(key, names)
+            if page is None:
+                # Read before rendering, so a write that lands meanwhile makes this entry stale
+                rendered_under = response_cache.versions(names)
+                response = make_response(view(**view_args))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                page = (body, response.mimetype, hashlib.sha256(body).hexdigest()[:32])
+                response_cache.put(key, rendered_under, ttl, page)
+            body, mimetype, etag = page
+            response = Response(body, mimetype=mimetype)
+            response.set_etag(etag)
+            # Browsers keep the page but revalidate every time, which costs a 304
+            response.cache_control.no_cache = True
+            if current_user.is_authenticated:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            response.vary.update(('Cookie',) + tuple(vary))
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def bump_on_commit(*names):
+    """Bump version keys once the current transaction commits. For writes the ORM
+    doesn't see: Core UPDATEs and raw SQL."""
+    db.session.info.setdefault('response_cache_versions', set()).update(names)
+
+
+def _changed_versions(session):
+    from flaskapp.models import Service, ServiceProvider, Order, Category, User
+
+    names = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Order):
+            # Order counts feed the home page leaderboard
+            names.update(('orders', f'service:{obj.ser_id}'))
+        elif isinstance(obj, (Service, ServiceProvider, Category)):
+            names.add('catalog')
+    for obj in session.dirty:
+        if not session.is_modified(obj):
+            continue
+        if isinstance(obj, Order):
+            # Reviews and ratings
+            names.add(f'service:{obj.ser_id}')
+        elif isinstance(obj, (Service, ServiceProvider, Category)):
+            names.add('catalog')
+        elif isinstance(obj, User) and inspect(obj).attrs.username.history.has_changes():
+            # Reviews show their author's name
+            names.add('users')
+    return names
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_versions(session, flush_context):
+    names = _changed_versions(session)
+    if names:
+        session.info.setdefault('response_cache_versions', set()).update(names)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_on_commit(session):
+    names = session.info.pop('response_cache_versions', None)
+    if names:
+        response_cache.bump(*names)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('response_cache_versions', None)
@@ -1,21 +1,17 @@
-import os
-import secrets
-from PIL import Image
-from flask import render_template, url_for, flash, redirect, request, abort
-from flaskapp import app, db, bcrypt, socketio
-from flaskapp.models import User, ServiceProvider, Service, Order, NotificationStatus, OrderStatus, Complaint, Category, Notification
+from flask import render_template, url_for, flash, redirect, request, abort, jsonify
+from flaskapp import app, db, socketio, leaderboard, search, ratings, analytics, notifications, order_status, images, catalog, dispatch
+from flaskapp.pagination import keyset_paginate
+from flaskapp.identity_cache import identity_cache
+from flaskapp.response_cache import response_cache, cached_page
+from flaskapp.passwords import password_hasher
+from flaskapp.models import User, ServiceProvider, Service, Order, NotificationStatus, NotificationKind, OrderStatus, Complaint, Category, Notification
 from flaskapp.forms import RegistrationForm, LoginForm, UpdateAccountForm, ReviewForm, ComplaintForm
 from flask_login import login_user, current_user, logout_user, login_required
-from sqlalchemy import or_
 from datetime import datetime
 from sqlalchemy.orm import joinedload
 from functools import wraps
-from flask_socketio import emit, join_room, leave_room
-from flaskapp.models import create_dummy_data
-from flask_bcrypt import Bcrypt
 from random import uniform
 
-bcrypt = Bcrypt()
 
 def admin_required(f):
     @wraps(f)
@@ -25,26 +21,11 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def save_picture(form_picture):
-    random_hex = secrets.token_hex(8)
-    _, f_ext = os.path.splitext(form_picture.filename)
-    picture_fn = random_hex + f_ext
-    picture_path = os.path.join(app.root_path, 'static/profile_pics', picture_fn)
-
-    output_size = (125, 125)
-    i = Image.open(form_picture)
-    i.thumbnail(output_size)
-    i.save(picture_path)
-
-    return picture_fn
-
 def getservices():
-    categories = Category.query.all()
+    snapshot = catalog.current()
     obj = {}
-    for category in categories:
-        top_service = (
-            db.session.query(Service).join(ServiceProvider).filter(Service.category_id == category.id, ServiceProvider.verified == True).order_by(Service.ratings.desc()).first()
-        )
+    for category in snapshot.categories:
+        top_service = snapshot.top_rated(category.id)
         if top_service:
             obj[category.name] = { 
                 "id": top_service.id,
@@ -57,39 +38,17 @@ def getservices():
     return obj
 
 def get_top_services_by_category():
-    categories = Category.query.all()
-    services_by_category = {}
-    category_order_counts = {}
-
-    for category in categories:
-        top_services = (
-            db.session.query(Service, db.func.count(Order.id).label('order_count'))
-            .select_from(Service)
-            .join(ServiceProvider, Service.provider_id == ServiceProvider.id)
-            .outerjoin(Order, Order.ser_id == Service.id)
-            .filter(Service.category_id == category.id, ServiceProvider.verified == True)
-            .group_by(Service.id)
-            .order_by(db.func.count(Order.id).desc())
-            .limit(3)
-            .all()
-        )
-        if top_services:
-            services_by_category[category.name] = [service for service, order_count in top_services]
-            category_order_counts[category.name] = sum(order_count for service, order_count in top_services)
-
-    # Sort categories by the number of orders
-    sorted_categories = sorted(category_order_counts.items(), key=lambda item: item[1], reverse=True)
-    sorted_services_by_category = {category: services_by_category[category] for category, _ in sorted_categories}
-
-    return sorted_services_by_category
+    return leaderboard.top_services_by_category()
 
 @app.route("/")
 @app.route("/home")
+@cached_page(ttl=300, versions=('catalog', 'orders'))
 def home():
     services_by_category = get_top_services_by_category()
     return render_template('home.html', services_by_category=services_by_category)
 
 @app.route("/about")
+@cached_page(ttl=3600)
 def about():
     return render_template('about.html', title='About')
 
@@ -99,7 +58,9 @@ def register():
         return redirect(url_for('home'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        # The uniqueness checks took the writer connection; hand it back before bcrypt runs
+        db.session.rollback()
+        hashed_password = password_hasher.hash(form.password.data)
         user = User(username=form.username.data, email=form.email.data, password=hashed_password)
         db.session.add(user)
         db.session.commit()
@@ -113,8 +74,16 @@ def login():
         return redirect(url_for('home'))
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        with password_hasher.timed('login'):
+            user = User.query.filter_by(email=form.email.data).first()
+            stored = user.password if user is not None else None
+            # Hand the writer connection back before bcrypt runs; a rehash commits in a short
+            # transaction of its own
+            db.session.rollback()
+            authenticated = stored is not None and password_hasher.verify_and_update(user, stored, form.password.data)
+            if authenticated:
+                db.session.commit()
+        if authenticated:
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('home'))
@@ -133,8 +102,11 @@ def account():
     form = UpdateAccountForm()
     if form.validate_on_submit():
         if form.picture.data:
-            picture_file = save_picture(form.picture.data)
-            current_user.image_file = picture_file
+            try:
+                current_user.image_file = images.submit_picture(form.picture.data)
+            except images.InvalidImage:
+                flash('That file is not a JPEG or PNG image.', 'danger')
+                return redirect(url_for('account'))
         current_user.username = form.username.data
         current_user.email = form.email.data
         db.session.commit()
@@ -143,20 +115,83 @@ def account():
     elif request.method == 'GET':
         form.username.data = current_user.username
         form.email.data = current_user.email
-    image_file = url_for('static', filename='profile_pics/' + current_user.image_file)
-    return render_template('account.html', title='Account', image_file=image_file, form=form)
+    return render_template('account.html', title='Account', form=form)
 
 @app.route("/admin")
 @login_required
 @admin_required
 def admin_dashboard():
-    users = User.query.all()
-    services = Service.query.all()
-    unresolved_complaints = Complaint.query.filter_by(resolved=False).all()
-    resolved_complaints = Complaint.query.filter_by(resolved=True).all()
-    categories = Category.query.all()
-    unverified_providers = ServiceProvider.query.filter_by(verified=False).all()
-    return render_template('admin.html', users=users, services=services, unresolved_complaints=unresolved_complaints, resolved_complaints=resolved_complaints, categories=categories, unverified_providers=unverified_providers)
+    # Only counts are computed here; each section is fetched page by page from admin_section
+    counts = db.session.execute(db.select(
+        db.select(db.func.count(User.id)).scalar_subquery().label('users'),
+        db.select(db.func.count(Service.id)).scalar_subquery().label('services'),
+        db.select(db.func.count(Complaint.id)).where(Complaint.resolved == False).scalar_subquery().label('unresolved_complaints'),
+        db.select(db.func.count(Complaint.id)).where(Complaint.resolved == True).scalar_subquery().label('resolved_complaints'),
+        db.select(db.func.count(ServiceProvider.id)).where(ServiceProvider.verified == False).scalar_subquery().label('unverified_providers'),
+    )).one()._asdict()
+    counts['categories'] = len(catalog.current().categories)
+    return render_template('admin.html', counts=counts, sections=ADMIN_SECTIONS)
+
+ADMIN_SECTIONS = {
+    'unresolved_complaints': (
+        'Unresolved Complaints',
+        lambda: Complaint.query.filter_by(resolved=False).options(joinedload(Complaint.user)),
+        [(Complaint.date_posted, True), (Complaint.id, True)],
+    ),
+    'resolved_complaints': (
+        'Resolved Complaints',
+        lambda: Complaint.query.filter_by(resolved=True).options(joinedload(Complaint.user)),
+        [(Complaint.date_posted, True), (Complaint.id, True)],
+    ),
+    'users': (
+        'Users',
+        lambda: User.query,
+        [(User.id, True)],
+    ),
+    'services': (
+        'Services',
+        lambda: Service.query.options(joinedload(Service.provider).joinedload(ServiceProvider.user)),
+        [(Service.date_posted, True), (Service.id, True)],
+    ),
+    'unverified_providers': (
+        'Unverified Service Providers',
+        lambda: ServiceProvider.query.filter_by(verified=False).options(joinedload(ServiceProvider.user)),
+        [(ServiceProvider.id, False)],
+    ),
+    'categories': (
+        'Existing Categories',
+        lambda: Category.query,
+        [(Category.name, False), (Category.id, False)],
+    ),
+}
+
+@app.route("/admin/section/<name>")
+@login_required
+@admin_required
+def admin_section(name):
+    if name not in ADMIN_SECTIONS:
+        abort(404)
+    _, make_query, sort_keys = ADMIN_SECTIONS[name]
+    page = keyset_paginate(make_query(), sort_keys, request.args.get('cursor'), request.args.get('per_page', type=int))
+    return render_template('admin_section.html', name=name, page=page)
+
+@app.route("/admin/identity_cache")
+@login_required
+@admin_required
+def identity_cache_stats():
+    return jsonify(identity_cache.stats())
+
+@app.route("/admin/response_cache")
+@login_required
+@admin_required
+def response_cache_stats():
+    return jsonify(response_cache.stats())
+
+@app.route("/admin/password_hashing")
+@login_required
+@admin_required
+def password_hashing_stats():
+    return jsonify(password_hasher.stats())
 
 @app.route("/approve_provider/<int:provider_id>", methods=['POST'])
 @login_required
@@ -215,15 +250,12 @@ def refund_user(complaint_id):
     complaint = Complaint.query.get_or_404(complaint_id)
     complaint.resolved = True
     complaint.action_taken = "User refunded"
-    db.session.commit()
-
-    # Create notification for the user
-    notification = Notification(
-        user_id=complaint.user_id,
-        message=f"Your complaint (ID: {complaint.id}) has been resolved with a refund.",
-        date_posted=datetime.utcnow()
+    notifications.notify(
+        complaint.user_id,
+        NotificationKind.refund,
+        f"Your complaint (ID: {complaint.id}) has been resolved with a refund.",
+        order_id=complaint.order_id,
     )
-    db.session.add(notification)
     db.session.commit()
 
     flash('User has been refunded.', 'success')
@@ -252,45 +284,36 @@ def warn_service_provider(complaint_id):
     service_provider = ServiceProvider.query.get_or_404(order.service_provider_id)
     complaint.resolved = True
     complaint.action_taken = "Service provider warned"
-    db.session.commit()
-
-    # Create notification for the service provider
-    notification = Notification(
-        user_id=service_provider.id,
-        message=f"You have been warned regarding complaint (ID: {complaint.id}).",
-        date_posted=datetime.utcnow()
+    notifications.notify(
+        service_provider.id,
+        NotificationKind.warning,
+        f"You have been warned regarding complaint (ID: {complaint.id}).",
+        order_id=complaint.order_id,
     )
-    db.session.add(notification)
     db.session.commit()
 
     flash('Service provider has been warned.', 'success')
     return redirect(url_for('admin_dashboard'))
 
 @app.route("/service/<int:service_id>")
+@cached_page(ttl=300, versions=('catalog', 'service:{service_id}'), vary=('Referer',))
 def servicedetails(service_id):
     details = Service.query.get_or_404(service_id)
-    orders = Order.query.filter_by(ser_id=service_id).all()
-    if orders:
-        valid_ratings = [order.rate for order in orders if order.rate is not None]
-        avg_rating = sum(valid_ratings) / len(valid_ratings) if valid_ratings else None
-    else:
-        avg_rating = None
+    avg_rating = details.average_rating
     referrer = request.referrer  # Get the referrer URL
     return render_template('service_details.html', details=details, avg_rating=avg_rating, referrer=referrer)
 
 @app.route('/join')
 @login_required
 def join():
-    service_provider = ServiceProvider.query.filter_by(id=current_user.id).first()
-    if service_provider:
+    if current_user.is_service_provider:
         flash('Service providers cannot join as users.', 'danger')
         return redirect(url_for('home'))
     return redirect(url_for('containform'))
 
 @app.route("/containform")
 def containform():
-    categories = Category.query.all()
-    return render_template("createServiceProviderprofileform.html", categories=categories)
+    return render_template("createServiceProviderprofileform.html", categories=catalog.current().categories)
 
 @app.route('/become_service_provider', methods=['GET', 'POST'])
 @login_required
@@ -308,13 +331,13 @@ def become_service_provider():
             flash('All fields are required.', 'danger')
             return redirect(url_for('become_service_provider'))
 
-        service_provider = db.session.query(ServiceProvider).filter(ServiceProvider.id == current_user.id).first()
-        if service_provider is None:
+        if not current_user.is_service_provider:
             latitude = uniform(20.0, 26.0)
             longitude = uniform(88.0, 92.0)
             service_provider = ServiceProvider(id=current_user.id, nid=nid, bio=bio, latitude=latitude, longitude=longitude)
             db.session.add(service_provider)
             db.session.commit()
+            current_user.refresh_roles()
 
         service = Service(
             title=title,
@@ -339,34 +362,21 @@ def search_result():
     max_price = request.args.get('max_price', type=float)  
     rating = request.args.get('rating', type=int) or 0   
 
-    results = Service.query.join(ServiceProvider).filter(ServiceProvider.verified == True)  # Only show verified providers
-
-    if query:
-        filters = [Service.title.ilike(f"%{word}%") for word in query]
-        results = results.filter(or_(*filters))
-
-    if min_price is not None:
-        results = results.filter(Service.ser_price >= min_price)
-
-    if max_price is not None:
-        results = results.filter(Service.ser_price <= max_price)
+    results, sort_keys = search.search_services(query, min_price, max_price, rating)
+    page = keyset_paginate(results, sort_keys, request.args.get('cursor'), request.args.get('per_page', type=int))
 
-    if rating >= 0 and rating <=5:
-        results = results.filter(Service.ratings >= rating)
-
-    # Apply sorting after all filters
-    results = results.order_by(Service.ser_price.asc(), Service.ratings.desc()).all()
-
-    return render_template('search_results.html', result=results)
+    return render_template('search_results.html', result=page.items, page=page, catalog=catalog.current())
 
 @app.route('/alluserorders')
 @login_required
 def alluserorders():
-    orders = (
+    orders = keyset_paginate(
         db.session.query(Order, Service)
         .join(Service, Order.ser_id == Service.id)  
-        .filter(Order.customer_id == current_user.id)  
-        .all()  
+        .filter(Order.customer_id == current_user.id),
+        [(Order.order_datetime, True), (Order.id, True)],
+        request.args.get('cursor'),
+        request.args.get('per_page', type=int),
     )
 
     combined_details = [
@@ -380,7 +390,7 @@ def alluserorders():
         for order, service in orders
     ]
 
-    return render_template('alluserorders.html', orders=combined_details)
+    return render_template('alluserorders.html', orders=combined_details, page=orders)
 
 @app.route('/userorderdetails/<int:order_id>')
 @login_required
@@ -414,73 +424,87 @@ def placeorder(service_id):
     return render_template('orderform.html', details=services, referrer=ref)
 
 @app.route('/submitOrder', methods=['POST'])
+@login_required
 def postorder():
     if request.method == 'POST':
         location = request.form.get('location')
-        date_time = datetime.fromisoformat(request.form.get('datetime'))
-        price = request.form.get('price', type=float)
         service_id = request.form.get('service_id', type=int)
-        service_provider_id = request.form.get('service_provider_id', type=int)
+        try:
+            date_time = datetime.fromisoformat(request.form.get('datetime', ''))
+        except ValueError:
+            date_time = None
 
-        if not location or not date_time or not price:
+        # The provider and the price come from the service, never from the form
+        service = db.session.get(Service, service_id) if service_id is not None else None
+        if service is None:
+            abort(404)
+
+        if not location or not date_time:
             flash("All fields are required!", "danger")
-            return redirect('/submitOrder')
+            return redirect(url_for('placeorder', service_id=service.id))
 
         # Generate random latitude and longitude for the order
         latitude = uniform(20.0, 26.0)
         longitude = uniform(88.0, 92.0)
 
+        if app.config['DISPATCH_AUTO_OFFER'] and not request.form.get('confirmed'):
+            best = dispatch.rank(latitude, longitude, service.category_id, k=1, exclude=(current_user.id,))
+            if best and best[0].service_id != service.id:
+                # Nothing is ordered until the customer picks the offered service or keeps theirs
+                return render_template('offer_confirm.html', picked=service, candidate=best[0],
+                                       alternative=db.session.get(Service, best[0].service_id),
+                                       location=location, datetime=request.form.get('datetime'))
+
         new_order = Order(
             order_loc=location,
             order_datetime=date_time,
-            price=price,
-            ser_id=service_id,
-            service_provider_id=service_provider_id,
+            price=service.ser_price,
+            ser_id=service.id,
+            service_provider_id=service.provider_id,
             customer_id=current_user.id,
             latitude=latitude,
             longitude=longitude
         )
 
         db.session.add(new_order)
+        db.session.flush()
+        analytics.record_order(new_order)
+        notifications.notify(
+            service.provider_id,
+            NotificationKind.order,
+            f"New order for {service.title} from {current_user.username}",
+            order_id=new_order.id,
+        )
         db.session.commit()
         flash("Order submitted successfully!", 'success')
         return redirect(url_for('payment', order_id=new_order.id))
 
 @app.route('/notification')
+@login_required
 def notification():
-    checkprovider = ServiceProvider.query.filter_by(id = current_user.id).first()
-    if checkprovider:
-        note = (db.session.query(Order, Service).join(Service, Order.ser_id == Service.id).filter(Order.notifications == 'not_viewed', Order.service_provider_id == checkprovider.id).all())
-        notes = [{
-            'id': order.id,
-            'price': order.price,
-            'order_datetime': order.order_datetime,
-            'status': order.status,
-            'service_title': service.title,
-            'loc' : order.order_loc,
-        } for order, service in note]
-
-        viewed = (db.session.query(Order, Service).join(Service, Order.ser_id == Service.id).filter(Order.notifications == 'viewed', Order.service_provider_id == checkprovider.id).all())
-        views = [{
-            'id': order.id,
-            'price': order.price,
-            'order_datetime': order.order_datetime,
-            'status': order.status,
-            'service_title': service.title,
-            'loc' : order.order_loc,
-        } for order, service in viewed]
-
-        # Fetch warning notifications for service providers
-        warning_notifications = Notification.query.filter(Notification.user_id == current_user.id, Notification.message.like('%warned%')).all()
-    else:
-        notes = None
-        views = None
-        warning_notifications = None
-
-    # Fetch refund notifications for users
-    refund_notifications = Notification.query.filter(Notification.user_id == current_user.id, Notification.message.like('%refunded%')).all()
+    # Read-only: the page posts to mark_notifications_read once it is shown
+    last_read = current_user.last_read_notification_id
+    # One query for the whole feed; order alerts carry their order and service title along
+    query = (
+        db.session.query(Notification, Order, Service.title)
+        .outerjoin(Order, Order.id == Notification.order_id)
+        .outerjoin(Service, Service.id == Order.ser_id)
+        .filter(Notification.user_id == current_user.id)
+    )
+    sort_keys = [(Notification.date_posted, True), (Notification.id, True)]
+    page = keyset_paginate(query, sort_keys, request.args.get('cursor'), request.args.get('per_page', type=int))
+    # What this page shows is what gets marked read
+    newest = max((note.id for note, _, _ in page), default=0)
+    return render_template('notification.html', page=page, last_read=last_read, newest=newest)
 
-    return render_template('notification.html', note = notes, viewed = views, refund_notifications=refund_notifications, warning_notifications=warning_notifications)
+@app.route('/notification/read', methods=['POST'])
+@login_required
+def mark_notifications_read():
+    through = request.form.get('through', type=int)
+    if through is None:
+        abort(400)
+    notifications.mark_read(current_user, through)
+    return redirect(url_for('notification'))
 
 @app.route('/updateNotification/<int:order_id>')
 def updateNotification(order_id):
@@ -495,54 +519,115 @@ def updateNotification(order_id):
 
     return redirect(url_for('notification'))
 
-@app.route('/acceptOrder/<int:order_id>', methods=['POST'])
-def acceptOrder(order_id):
-    order = Order.query.get_or_404(order_id)
-
-    order.status = OrderStatus.accepted
-    order.notifications = NotificationStatus.viewed
+STATUS_MESSAGES = {
+    order_status.UPDATED: ('Order status updated to "{status}".', 'success'),
+    order_status.UNCHANGED: ('This order is already marked as "{status}".', 'warning'),
+    order_status.ILLEGAL: ('An order that is {current} cannot be marked as "{status}".', 'danger'),
+    order_status.CONFLICT: ('The order changed while it was being updated, please try again.', 'warning'),
+}
+
+def change_order_status(order_id, status, next_endpoint):
+    if not current_user.is_service_provider:
+        abort(403)
+    result, = order_status.transition_orders(current_user.id, [(order_id, status)])
+    if result.outcome == order_status.NOT_FOUND:
+        abort(404)
+    if result.outcome == order_status.FORBIDDEN:
+        abort(403)
     db.session.commit()
-    flash('Order status updated to "Accepted".', 'success')
+    message, category = STATUS_MESSAGES[result.outcome]
+    current = result.from_status.value if result.from_status else ''
+    flash(message.format(status=status.value.capitalize(), current=current), category)
+    return redirect(url_for(next_endpoint))
 
-    return redirect(url_for('notification'))
+@app.route('/acceptOrder/<int:order_id>', methods=['POST'])
+@login_required
+def acceptOrder(order_id):
+    return change_order_status(order_id, OrderStatus.accepted, 'notification')
 
 @app.route('/rejectOrder/<int:order_id>', methods=['POST'])
+@login_required
 def rejectOrder(order_id):
-    order = Order.query.get_or_404(order_id)
+    return change_order_status(order_id, OrderStatus.rejected, 'notification')
+
+@app.route('/orders/status', methods=['POST'])
+@login_required
+def bulk_order_status():
+    """Apply many status changes in one transaction.
+
+    JSON clients send {"changes": [{"order_id": 1, "status": "accepted"}, ...]} and get
+    per-order results back; the accepted orders page posts order_id fields and a status.
+    """
+    if not current_user.is_service_provider:
+        return "Access Denied: Not a Service Provider", 403
 
-    order.status = OrderStatus.rejected
-    order.notifications = NotificationStatus.viewed
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        items = payload.get('changes') if isinstance(payload, dict) else None
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({'error': 'changes must be a list of {order_id, status} objects'}), 400
+        changes = [(item.get('order_id'), order_status.parse_status(item.get('status'))) for item in items]
+    else:
+        status = order_status.parse_status(request.form.get('status', ''))
+        changes = [(order_id, status) for order_id in request.form.getlist('order_id', type=int)]
+
+    if not changes or any(not isinstance(order_id, int) or status is None for order_id, status in changes):
+        if request.is_json:
+            return jsonify({'error': 'every change needs an integer order_id and a known status'}), 400
+        flash('Select at least one order and a status.', 'danger')
+        return redirect(url_for('accepted_orders'))
+    if len(changes) > order_status.MAX_CHANGES:
+        if request.is_json:
+            return jsonify({'error': f'at most {order_status.MAX_CHANGES} changes per request'}), 400
+        flash(f'Update at most {order_status.MAX_CHANGES} orders at a time.', 'danger')
+        return redirect(url_for('accepted_orders'))
+
+    results = order_status.transition_orders(current_user.id, changes)
     db.session.commit()
-    flash('Order status updated to "Rejected".', 'success')
 
-    return redirect(url_for('notification'))
+    updated = sum(result.outcome == order_status.UPDATED for result in results)
+    if request.is_json:
+        return jsonify({
+            'updated': updated,
+            'results': [{
+                'order_id': result.order_id,
+                'outcome': result.outcome,
+                'from': result.from_status.name if result.from_status else None,
+                'to': result.to_status.name,
+            } for result in results],
+        })
+    skipped = len(results) - updated
+    flash(f'Updated {updated} order(s).' + (f' {skipped} could not be changed.' if skipped else ''), 'success' if not skipped else 'warning')
+    return redirect(url_for('accepted_orders'))
 
 @app.route("/accepted_orders", methods=['GET', 'POST'], endpoint='accepted_orders')
 @login_required
 def view_orders():
-    service_provider = ServiceProvider.query.filter_by(id=current_user.id).first()
-    if not service_provider:
+    if not current_user.is_service_provider:
         return "Access Denied: Not a Service Provider", 403
 
+    sort_keys = [(Order.order_datetime, True), (Order.id, True)]
+    per_page = request.args.get('per_page', type=int)
+
     # Query for accepted and ongoing orders with related service and customer information
-    accepted_orders = db.session.query(Order, Service, User).join(
+    accepted_orders = keyset_paginate(db.session.query(Order, Service, User).join(
         Service, Order.ser_id == Service.id
     ).join(
         User, Order.customer_id == User.id
     ).filter(
-        Order.service_provider_id == service_provider.id,
+        Order.service_provider_id == current_user.id,
         Order.status.in_([OrderStatus.accepted, OrderStatus.on_the_way, OrderStatus.reached])
-    ).all()
+    ), sort_keys, request.args.get('accepted_cursor'), per_page)
 
     # Query for completed orders with related service and customer information
-    completed_orders = db.session.query(Order, Service, User).join(
+    completed_orders = keyset_paginate(db.session.query(Order, Service, User).join(
         Service, Order.ser_id == Service.id
     ).join(
         User, Order.customer_id == User.id
     ).filter(
-        Order.service_provider_id == service_provider.id,
+        Order.service_provider_id == current_user.id,
         Order.status == OrderStatus.completed
-    ).all()
+    ), sort_keys, request.args.get('completed_cursor'), per_page)
 
     return render_template(
         'acceptedorders.html',
@@ -553,63 +638,17 @@ def view_orders():
 @app.route('/mark_reached/<int:order_id>', methods=['POST'])
 @login_required
 def mark_reached(order_id):
-    order = Order.query.get_or_404(order_id)
-
-    if order.status == 'reached':
-        flash('This order is already marked as "Reached".', 'warning')
-    else:
-        order.status = OrderStatus.reached
-        db.session.commit()
-        flash('Order status updated to "Reached".', 'success')
-
-    return redirect(url_for('accepted_orders'))
+    return change_order_status(order_id, OrderStatus.reached, 'accepted_orders')
 
 @app.route('/mark_ontheway/<int:order_id>', methods=['POST'])
 @login_required
-def mark_ontheway(order_id):  
-    order = Order.query.get_or_404(order_id)
-
-    order.status = OrderStatus.on_the_way 
-    db.session.commit()
-    flash('Order status updated to "On the way".', 'success')
-    return redirect(url_for('accepted_orders'))
+def mark_ontheway(order_id):
+    return change_order_status(order_id, OrderStatus.on_the_way, 'accepted_orders')
 
 @app.route('/mark_completed/<int:order_id>', methods=['POST'])
 @login_required
 def mark_completed(order_id):
-    order = Order.query.get_or_404(order_id)
-
-    order.status = OrderStatus.completed
-    db.session.commit()
-    flash('Order status updated to "Completed".', 'success')
-    return redirect(url_for('accepted_orders'))
-
-@app.route('/chat')
-@login_required
-def chat():
-    return render_template('chat.html', title='Chat')
-
-# Handle a user joining a chat room
-@socketio.on('join')
-def on_join(data):
-    room = data['room']
-    username = current_user.username
-    join_room(room)
-    emit('message', {'msg': f'{username} has joined the room.'}, room=room)
-
-# Handle a user leaving a chat room
-@socketio.on('leave')
-def on_leave(data):
-    room = data['room']
-    username = current_user.username
-    leave_room(room)
-    emit('message', {'msg': f'{username} has left the room.'}, room=room)
-
-# Handle messages sent by users
-@socketio.on('send_message')
-def handle_message(data):
-    room = data['room']
-    emit('message', {'username': current_user.username, 'msg': data['msg']}, room=room)
+    return change_order_status(order_id, OrderStatus.completed, 'accepted_orders')
 
 @app.route('/order/<int:order_id>')
 def order_details(order_id):
@@ -633,13 +672,21 @@ def order_details(order_id):
     )
 
 @app.route("/service/<int:service_id>/view_reviews")
+@cached_page(ttl=300, versions=('service:{service_id}', 'users'))
 def view_reviews(service_id):
-    orders = Order.query.filter_by(ser_id=service_id).all()
+    stars = request.args.get('stars', type=int)
+    feed = (
+        db.session.query(Order.review, Order.rate, User.username)
+        .join(User, Order.customer_id == User.id)
+        .filter(Order.ser_id == service_id, Order.review.isnot(None))
+    )
+    if stars is not None:
+        feed = feed.filter(Order.rate == stars)
+    page = keyset_paginate(feed, [(Order.order_datetime, True), (Order.id, True)], request.args.get('cursor'), request.args.get('per_page', type=int))
 
-    reviews = [{"review": order.review, "rate": order.rate, "customer": User.query.get(order.customer_id).username}
-               for order in orders if order.review]
+    reviews = [{"review": review, "rate": rate, "customer": username} for review, rate, username in page]
 
-    return render_template('view_reviews.html', reviews=reviews, service_id=service_id)
+    return render_template('view_reviews.html', reviews=reviews, page=page, stars=stars, service_id=service_id)
 
 @app.route('/payment/<int:order_id>', methods=['GET', 'POST'])
 @login_required
@@ -707,10 +754,18 @@ def mobile_payment(order_id):
 @login_required
 def review_order(order_id):
     order = Order.query.get_or_404(order_id)
+    # Reviews feed every rating aggregate, so only the customer of a finished order gets one
+    if order.customer_id != current_user.id:
+        abort(403)
+    if order.status != OrderStatus.completed:
+        flash('Only completed orders can be reviewed.', 'warning')
+        return redirect(url_for('alluserorders'))
     if request.method == 'POST':
-        rating = request.form.get('rating', type=float)
+        rating = request.form.get('rating', type=int)
         review = request.form.get('review')
-        if rating is not None and review:
+        if rating is not None and review and 0 <= rating <= 5:
+            ratings.record_rating(order.linked_service, order.rate, rating)
+            analytics.record_review(order, order.rate, rating)
             order.rate = rating
             order.review = review
             db.session.commit()
@@ -720,64 +775,17 @@ def review_order(order_id):
             flash('Please provide both rating and review.', 'danger')
     return render_template('review_order.html', order=order)
 
-@app.route('/analytics')
+@app.route('/analytics', endpoint='analytics')
 @login_required
-def analytics():
-    service_provider_id = current_user.id  
-
-    total_orders = Order.query.filter_by(service_provider_id=service_provider_id).count()
-
-    total_revenue = (
-        db.session.query(db.func.sum(Order.price))
-        .filter_by(service_provider_id=service_provider_id)
-        .scalar()
-        or 0.0
-    )
-
-    most_requested_service_id = (
-        db.session.query(Order.ser_id, db.func.count(Order.ser_id))
-        .filter_by(service_provider_id=service_provider_id)
-        .group_by(Order.ser_id)
-        .order_by(db.func.count(Order.ser_id).desc())
-        .first()
-    )
-
-    most_requested_service = (
-        Service.query.get(most_requested_service_id[0]).title
-        if most_requested_service_id
-        else "N/A"
-    )
-
-    # Additional analytics data
-    total_customers = (
-        db.session.query(db.func.count(db.distinct(Order.customer_id)))
-        .filter_by(service_provider_id=service_provider_id)
-        .scalar()
-    )
-
-    average_rating = (
-        db.session.query(db.func.avg(Order.rate))
-        .filter_by(service_provider_id=service_provider_id)
-        .scalar()
-        or 0.0
-    )
-
-    total_complaints = (
-        db.session.query(db.func.count(Complaint.id))
-        .join(Order, Complaint.order_id == Order.id)
-        .filter(Order.service_provider_id == service_provider_id)
-        .scalar()
-    )
+def analytics_dashboard():
+    if not current_user.is_service_provider:
+        return "Access Denied: Not a Service Provider", 403
 
-    analytics_data = {
-        "total_orders": total_orders,
-        "revenue": total_revenue,
-        "most_requested_service": most_requested_service,
-        "total_customers": total_customers,
-        "average_rating": round(average_rating, 2),
-        "total_complaints": total_complaints,
-    }
-    return render_template('analytics.html', data=analytics_data)
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in analytics.BUCKETS:
+        bucket = 'day'
+    analytics_data = analytics.provider_summary(current_user.id, bucket)
+    return render_template('analytics.html', data=analytics_data, bucket=bucket, buckets=analytics.BUCKETS)
 
 @app.route('/submit_complaint/<int:order_id>', methods=['POST'])
 @login_required
@@ -787,18 +795,14 @@ def submit_complaint(order_id):
     if complaint_text:
         complaint = Complaint(order_id=order.id, user_id=current_user.id, message=complaint_text)
         db.session.add(complaint)
+        db.session.flush()
+        analytics.record_complaint(complaint, order)
         db.session.commit()
         flash('Your complaint has been submitted.', 'success')
     else:
         flash('Please provide a complaint message.', 'danger')
     return redirect(url_for('userorderdetails', order_id=order_id))
 
-@app.route('/create_dummy_data')
-def create_data():
-    create_dummy_data()
-    flash('Dummy data created successfully!', 'success')
-    return redirect(url_for('home'))
-
 @app.route("/make_admin/<int:user_id>", methods=['POST'])
 @login_required
 @admin_required
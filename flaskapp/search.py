@@ -0,0 +1,131 @@
+import re
+import click
+from sqlalchemy import event, literal_column, or_, table
+from flaskapp import app, db
+from flaskapp.models import Service, ServiceProvider
+
+# Column weights for bm25(): title matches count most, then category, then description
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS service_fts USING fts5(
+        title, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS service_fts_ai AFTER INSERT ON service BEGIN
+        INSERT INTO service_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, (SELECT name FROM category WHERE id = new.category_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS service_fts_ad AFTER DELETE ON service BEGIN
+        DELETE FROM service_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS service_fts_au AFTER UPDATE OF title, description, category_id ON service BEGIN
+        DELETE FROM service_fts WHERE rowid = old.id;
+        INSERT INTO service_fts(rowid, title, description, category)
+        VALUES (new.id, new.title, new.description, (SELECT name FROM category WHERE id = new.category_id));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS category_fts_au AFTER UPDATE OF name ON category BEGIN
+        UPDATE service_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM service WHERE category_id = new.id);
+    END""",
+]
+
+REBUILD_SQL = """
+    INSERT INTO service_fts(rowid, title, description, category)
+    SELECT service.id, service.title, service.description, category.name
+    FROM service LEFT JOIN category ON category.id = service.category_id
+"""
+
+_service_fts = literal_column('service_fts')
+_rank = db.func.bm25(_service_fts, *BM25_WEIGHTS)
+
+
+def fts_available(bind=None):
+    bind = bind if bind is not None else db.engine
+    return bind.dialect.name == 'sqlite'
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_search_index(target, connection, **kw):
+    if not fts_available(connection):
+        return
+    for statement in FTS_DDL:
+        connection.exec_driver_sql(statement)
+    # Backfill databases that had services before the index existed
+    indexed = connection.exec_driver_sql("SELECT count(*) FROM service_fts").scalar()
+    if not indexed and connection.exec_driver_sql("SELECT count(*) FROM service").scalar():
+        connection.exec_driver_sql(REBUILD_SQL)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_search_index(target, connection, **kw):
+    if fts_available(connection):
+        connection.exec_driver_sql("DROP TABLE IF EXISTS service_fts")
+
+
+def rebuild_index():
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM service_fts")
+        connection.exec_driver_sql(REBUILD_SQL)
+        return connection.exec_driver_sql("SELECT count(*) FROM service_fts").scalar()
+
+
+def match_expression(words):
+    # Quote every word so user input can't inject FTS5 syntax, and prefix-match it so
+    # "clean" also finds "cleaning". Words are OR'ed like the old LIKE filters were.
+    terms = []
+    for word in words:
+        word = re.sub(r'[^\w]+', ' ', word).strip()
+        for token in word.split():
+            terms.append(f'"{token}"*')
+    return ' OR '.join(terms)
+
+
+def _apply_filters(query, min_price, max_price, min_rating):
+    query = query.join(ServiceProvider, Service.provider_id == ServiceProvider.id).filter(ServiceProvider.verified == True)  # Only show verified providers
+    if min_price is not None:
+        query = query.filter(Service.ser_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Service.ser_price <= max_price)
+    if min_rating is not None and 0 <= min_rating <= 5:
+        query = query.filter(Service.ratings >= min_rating)
+    return query
+
+
+def _ordered(query, sort_keys):
+    return query.order_by(*[column.desc() if descending else column.asc() for column, descending in sort_keys]), sort_keys
+
+
+# Both search paths return (query, sort_keys); sort_keys are (column, descending) pairs
+# ending in the primary key, ready for pagination.keyset_paginate.
+def like_search(words, min_price=None, max_price=None, min_rating=0):
+    # The original unindexed search; still used when FTS5 isn't available
+    query = _apply_filters(Service.query, min_price, max_price, min_rating)
+    if words:
+        query = query.filter(or_(*[Service.title.ilike(f"%{word}%") for word in words]))
+    return _ordered(query, [(Service.ser_price, False), (Service.ratings, True), (Service.id, False)])
+
+
+def search_services(words, min_price=None, max_price=None, min_rating=0):
+    match = match_expression(words)
+    if not match or not fts_available():
+        return like_search(words if match else [], min_price, max_price, min_rating)
+
+    hits = (
+        db.select(literal_column('rowid').label('service_id'), _rank.label('rank'))
+        .select_from(table('service_fts'))
+        .where(_service_fts.op('MATCH')(match))
+        .subquery()
+    )
+    query = Service.query.join(hits, hits.c.service_id == Service.id)
+    query = _apply_filters(query, min_price, max_price, min_rating)
+    # bm25() is lower for better matches; price and rating break ties as before
+    return _ordered(query, [(hits.c.rank, False), (Service.ser_price, False), (Service.ratings, True), (Service.id, False)])
+
+
+@app.cli.command('search-reindex')
+def search_reindex_command():
+    """Rebuild the full-text search index from the service table."""
+    db.create_all()
+    click.echo(f'Indexed {rebuild_index()} services.')
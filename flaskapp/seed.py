@@ -0,0 +1,282 @@
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+import click
+from flaskapp import app, db
+from flaskapp.models import (User, ServiceProvider, Category, Service, Order, Complaint, Notification,
+                             OrderStatus, NotificationStatus, NotificationKind)
+
+FIRST_NAMES = [
+    'Arjun', 'Amit', 'Bijoy', 'Chandan', 'Dipak', 'Esha', 'Farhan', 'Gopal', 'Harun', 'Ishita',
+    'Jahid', 'Kabir', 'Liton', 'Mithun', 'Nadia', 'Omar', 'Puja', 'Quazi', 'Rana', 'Sima',
+    'Tuhin', 'Usha', 'Vikram', 'Wahid', 'Xavier', 'Yasmin', 'Zahid', 'Anika', 'Bithi', 'Chitra',
+    'Debashish', 'Elina', 'Fahim', 'Gita', 'Hassan', 'Indira', 'Joya', 'Kamal', 'Laila', 'Mona',
+    'Nafisa', 'Oishi', 'Parvez', 'Quamrul', 'Rafiq', 'Shima', 'Tanvir', 'Uday', 'Vivek', 'Wasim',
+]
+
+SERVICE_NAMES = {
+    'Cleaning': ['House Cleaning', 'Office Cleaning', 'Window Cleaning', 'Carpet Cleaning', 'Deep Cleaning'],
+    'Plumbing': ['Leak Repair', 'Drain Cleaning', 'Pipe Installation', 'Water Heater Repair', 'Toilet Repair'],
+    'Electrical': ['Wiring Installation', 'Light Fixture Installation', 'Electrical Repair', 'Circuit Breaker Replacement', 'Outlet Installation'],
+    'Carpentry': ['Furniture Assembly', 'Cabinet Installation', 'Deck Building', 'Door Installation', 'Trim Work'],
+    'Painting': ['Interior Painting', 'Exterior Painting', 'Wallpaper Removal', 'Fence Painting', 'Deck Staining'],
+}
+
+# (name, latitude, longitude, relative weight): most demand sits in a few large cities
+CITIES = [
+    ('Dhaka', 23.81, 90.41, 40), ('Chittagong', 22.36, 91.78, 14), ('Khulna', 22.85, 89.54, 6),
+    ('Rajshahi', 24.37, 88.60, 5), ('Sylhet', 24.89, 91.87, 5), ('Gazipur', 24.00, 90.42, 5),
+    ('Narayanganj', 23.62, 90.50, 4), ('Comilla', 23.46, 91.18, 3), ('Barisal', 22.70, 90.35, 3),
+    ('Rangpur', 25.75, 89.25, 3), ('Mymensingh', 24.75, 90.41, 3), ("Cox's Bazar", 21.43, 92.01, 2),
+    ('Bogra', 24.85, 89.37, 2), ('Jessore', 23.17, 89.21, 2), ('Dinajpur', 25.63, 88.64, 1),
+]
+
+# Share of orders in each status; most orders in a mature marketplace are finished
+STATUS_WEIGHTS = [
+    (OrderStatus.completed, 70), (OrderStatus.pending, 8), (OrderStatus.accepted, 6),
+    (OrderStatus.on_the_way, 3), (OrderStatus.reached, 3), (OrderStatus.rejected, 10),
+]
+
+SEED_PASSWORD = 'password'
+# Orders are spread over the days before this moment, so a seed gives the same rows on every run
+ANCHOR = datetime(2025, 1, 1)
+
+
+def zipf_weights(n, s=1.1):
+    return [1 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+class Generator:
+    """Deterministic bulk loader. Rows go in through Core executemany, chunk_size rows
+    per statement and one transaction per chunk, on a single connection."""
+
+    def __init__(self, connection, seed, chunk_size, days, now):
+        self.connection = connection
+        self.rng = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.now = now.replace(microsecond=0)
+        self.days = days
+        self.city_cum = cumulative([city[3] for city in CITIES])
+
+    def insert(self, table, rows):
+        count = 0
+        for chunk in iter(lambda: list(itertools.islice(rows, self.chunk_size)), []):
+            self.connection.execute(db.insert(table), chunk)
+            self.connection.commit()
+            count += len(chunk)
+        return count
+
+    def next_id(self, table):
+        return (self.connection.execute(db.select(db.func.max(table.id))).scalar() or 0) + 1
+
+    def place(self):
+        name, lat, lon, _ = self.rng.choices(CITIES, cum_weights=self.city_cum)[0]
+        return name, lat + self.rng.gauss(0, 0.08), lon + self.rng.gauss(0, 0.08)
+
+    def users(self, count, password):
+        first = self.next_id(User)
+        self.user_ids = range(first, first + count)
+        fresh_database = first == 1
+
+        def rows():
+            for user_id in self.user_ids:
+                name = FIRST_NAMES[user_id % len(FIRST_NAMES)]
+                yield {
+                    'id': user_id, 'username': f'{name}{user_id}', 'email': f'{name.lower()}{user_id}@example.com',
+                    'image_file': 'default.jpg', 'password': password,
+                    # The first user of a fresh database can sign in to /admin
+                    'is_admin': fresh_database and user_id == 1,
+                }
+        return self.insert(User, rows())
+
+    def providers(self, count):
+        # The first `count` new users also offer services
+        self.provider_ids = self.user_ids[:count]
+
+        def rows():
+            for provider_id in self.provider_ids:
+                _, lat, lon = self.place()
+                yield {
+                    'id': provider_id, 'nid': str(1_000_000_000 + provider_id),
+                    'bio': f'Service Provider {FIRST_NAMES[provider_id % len(FIRST_NAMES)]} Bio',
+                    'verified': self.rng.random() < 0.85, 'latitude': lat, 'longitude': lon,
+                }
+        return self.insert(ServiceProvider, rows())
+
+    def categories(self, count):
+        existing = {name: category_id for category_id, name in self.connection.execute(db.select(Category.id, Category.name))}
+        names = list(SERVICE_NAMES) + [f'Category {i}' for i in range(len(SERVICE_NAMES) + 1, count + 1)]
+        missing = [{'name': name} for name in names[:count] if name not in existing]
+        self.insert(Category, iter(missing))
+        existing = {name: category_id for category_id, name in self.connection.execute(db.select(Category.id, Category.name))}
+        # Popular categories (cleaning, plumbing...) get most services and orders
+        self.category_ids = [existing[name] for name in names[:count]]
+        self.category_names = names[:count]
+        return len(missing)
+
+    def services(self, per_provider):
+        first = self.next_id(Service)
+        category_cum = cumulative(zipf_weights(len(self.category_ids)))
+        self.service_rows = []
+
+        def rows():
+            service_id = first
+            for provider_id in self.provider_ids:
+                for _ in range(self.rng.randint(1, per_provider)):
+                    index = self.rng.choices(range(len(self.category_ids)), cum_weights=category_cum)[0]
+                    name = self.category_names[index]
+                    price = self.rng.randint(10, 100)
+                    self.service_rows.append((service_id, provider_id, price))
+                    yield {
+                        'id': service_id, 'title': self.rng.choice(SERVICE_NAMES.get(name, [f'{name} Service'])),
+                        'description': f'{name} service description', 'user_id': provider_id, 'provider_id': provider_id,
+                        'ratings': 0, 'category_id': self.category_ids[index], 'duration': self.rng.randint(1, 5),
+                        'ser_price': price, 'date_posted': self.now - timedelta(days=self.days),
+                    }
+                    service_id += 1
+        return self.insert(Service, rows())
+
+    def orders(self, count, complaint_rate):
+        first = self.next_id(Order)
+        self.order_ids = range(first, first + count)
+        # A few services and a few customers account for most of the orders
+        services = self.service_rows[:]
+        self.rng.shuffle(services)
+        service_cum = cumulative(zipf_weights(len(services), 0.9))
+        customers = list(self.user_ids)
+        self.rng.shuffle(customers)
+        customer_cum = cumulative(zipf_weights(len(customers), 0.8))
+        status_values, status_weights = zip(*STATUS_WEIGHTS)
+        status_cum = cumulative(status_weights)
+        span = self.days * 86400
+        self.complained = []
+
+        def rows():
+            for offset in range(0, count, self.chunk_size):
+                size = min(self.chunk_size, count - offset)
+                picked_services = self.rng.choices(services, cum_weights=service_cum, k=size)
+                picked_customers = self.rng.choices(customers, cum_weights=customer_cum, k=size)
+                picked_statuses = self.rng.choices(status_values, cum_weights=status_cum, k=size)
+                for i in range(size):
+                    order_id = first + offset + i
+                    service_id, provider_id, price = picked_services[i]
+                    status = picked_statuses[i]
+                    place, lat, lon = self.place()
+                    rated = status == OrderStatus.completed and self.rng.random() < 0.5
+                    rate = min(5, max(1, round(self.rng.gauss(4.0, 1.0)))) if rated else None
+                    placed = self.now - timedelta(seconds=int(span * self.rng.random() ** 0.7))
+                    row = {
+                        'id': order_id, 'order_loc': place, 'order_datetime': placed, 'status': status.name,
+                        'review': 'Great service!' if rate and rate >= 4 else ('Could be better.' if rate else None),
+                        'rate': rate, 'price': round(price * self.rng.uniform(0.9, 1.3), 2),
+                        'notifications': NotificationStatus.viewed.name if status != OrderStatus.pending else NotificationStatus.not_viewed.name,
+                        'ser_id': service_id, 'customer_id': picked_customers[i], 'service_provider_id': provider_id,
+                        'latitude': lat, 'longitude': lon,
+                    }
+                    if status != OrderStatus.rejected and self.rng.random() < complaint_rate:
+                        self.complained.append((order_id, picked_customers[i], placed))
+                    yield row
+        return self.insert(Order, rows())
+
+    def complaints(self):
+        def rows():
+            for order_id, customer_id, placed in self.complained:
+                yield {
+                    'order_id': order_id, 'user_id': customer_id, 'message': 'The job was not done properly.',
+                    'date_posted': placed + timedelta(days=self.rng.randint(1, 5)), 'resolved': self.rng.random() < 0.6,
+                }
+        return self.insert(Complaint, rows())
+
+    def order_alerts(self):
+        # Copied over inside SQLite rather than carried in memory for every order
+        result = self.connection.execute(
+            db.insert(Notification).from_select(
+                ['user_id', 'kind', 'message', 'date_posted', 'order_id'],
+                db.select(Order.service_provider_id, db.literal(NotificationKind.order.name), db.literal('New order'),
+                          Order.order_datetime, Order.id)
+                .where(Order.id.between(self.order_ids.start, self.order_ids.stop - 1))
+                .order_by(Order.id)
+            )
+        )
+        self.connection.commit()
+        return result.rowcount
+
+
+def load(users=1000, providers=100, categories=5, services_per_provider=3, orders=10000, complaint_rate=0.01,
+         days=365, alerts=True, seed=471, chunk_size=10000, reset=False, now=ANCHOR, echo=None):
+    """Bulk-load synthetic data into the app's database; see the seed command for the
+    options. echo, if given, is called with one progress line per step."""
+    from flaskapp import ratings, analytics
+    from flaskapp.passwords import password_hasher
+
+    echo = echo or (lambda line: None)
+    if reset:
+        db.drop_all()
+    db.create_all()
+
+    started = time.perf_counter()
+    password = password_hasher.hash(SEED_PASSWORD)
+    with db.engine.connect() as connection:
+        # Durability is not worth paying for while bulk loading throwaway data
+        connection.exec_driver_sql('PRAGMA synchronous=OFF')
+        connection.commit()
+        generator = Generator(connection, seed, chunk_size, days, now)
+        steps = [
+            ('users', lambda: generator.users(users, password)),
+            ('providers', lambda: generator.providers(providers)),
+            ('categories', lambda: generator.categories(categories)),
+            ('services', lambda: generator.services(services_per_provider)),
+            ('orders', lambda: generator.orders(orders, complaint_rate)),
+            ('complaints', generator.complaints),
+        ]
+        if alerts:
+            steps.append(('order alerts', generator.order_alerts))
+        for label, step in steps:
+            step_started = time.perf_counter()
+            count = step()
+            echo(f'{label:<13} {count:>10} rows  {time.perf_counter() - step_started:7.1f}s')
+        # Everything seeded counts as already read
+        connection.exec_driver_sql("""
+            UPDATE user SET unread_notifications = 0, last_read_notification_id = coalesce(
+                (SELECT max(id) FROM notification WHERE notification.user_id = user.id), 0)
+        """)
+        connection.commit()
+
+    # The search and spatial indexes are kept up by triggers; the aggregates are rebuilt here
+    step_started = time.perf_counter()
+    ratings.backfill()
+    analytics.backfill()
+    echo(f'{"aggregates":<13} {"":>10}       {time.perf_counter() - step_started:7.1f}s')
+    return time.perf_counter() - started
+
+
+@app.cli.command('seed')
+@click.option('--users', default=1000, show_default=True, help='Users to create, providers included.')
+@click.option('--providers', default=100, show_default=True, help='How many of the new users offer services.')
+@click.option('--categories', default=5, show_default=True)
+@click.option('--services-per-provider', default=3, show_default=True, help='Upper bound; each provider gets 1..N.')
+@click.option('--orders', default=10000, show_default=True)
+@click.option('--complaint-rate', default=0.01, show_default=True, help='Share of orders with a complaint.')
+@click.option('--days', default=365, show_default=True, help='Spread orders over this many days before --now.')
+@click.option('--now', type=click.DateTime(), default=ANCHOR.isoformat(), show_default=True,
+              help='When the seeded history ends.')
+@click.option('--alerts/--no-alerts', default=True, show_default=True, help='Create the provider notification for every order.')
+@click.option('--seed', 'seed_value', default=471, show_default=True, help='Random seed; the same options give the same data.')
+@click.option('--chunk-size', default=10000, show_default=True)
+@click.option('--reset', is_flag=True, help='Drop and recreate every table first.')
+def seed_command(users, providers, categories, services_per_provider, orders, complaint_rate, days, now, alerts, seed_value,
+                 chunk_size, reset):
+    """Bulk-load synthetic users, providers, services and orders for load testing.
+
+    Every user's password is 'password'.
+    """
+    if providers > users:
+        raise click.BadParameter('cannot exceed --users', param_hint='--providers')
+    elapsed = load(users, providers, categories, services_per_provider, orders, complaint_rate, days, alerts,
+                   seed_value, chunk_size, reset, now, echo=click.echo)
+    click.echo(f'Done in {elapsed:.1f}s. Every user signs in with the password "{SEED_PASSWORD}".')
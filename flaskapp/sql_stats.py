@@ -0,0 +1,136 @@
+import json
+import re
+import time
+from collections import Counter
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from flaskapp import app, db
+
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(statement):
+    # Expanded IN lists and inlined numbers would make every call look different
+    statement = _SPACE.sub(' ', statement).strip()
+    return _NUMBER.sub('N', _IN_LIST.sub('(?...)', statement))
+
+
+class SQLStats:
+    # Statements run within one request or Socket.IO event
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def repeated(self):
+        limit = app.config['SQL_REPEAT_LIMIT']
+        return [(statement, count) for statement, count in self.fingerprints.most_common() if count >= limit]
+
+    def max_repeat(self):
+        return self.fingerprints.most_common(1)[0][1] if self.fingerprints else 0
+
+
+def query_budget(limit):
+    """Override SQL_QUERY_BUDGET for one view."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def current_stats():
+    # None outside requests and events, e.g. in the chat flusher or a CLI bulk load
+    if not has_request_context():
+        return None
+    stats = g.get('sql_stats')
+    if stats is None:
+        stats = g.sql_stats = SQLStats()
+    return stats
+
+
+def _budget():
+    view = app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, 'query_budget', app.config['SQL_QUERY_BUDGET'])
+
+
+def _scope():
+    # Flask-SocketIO runs each event inside a request context carrying the event name
+    socket_event = getattr(request, 'event', None)
+    if socket_event is not None:
+        return {'event': socket_event['message'], 'namespace': getattr(request, 'namespace', '/')}
+    return {'method': request.method, 'path': request.path, 'endpoint': request.endpoint}
+
+
+def _problems(stats):
+    problems = []
+    budget = _budget()
+    if stats.queries > budget:
+        problems.append(f'{stats.queries} queries (budget {budget})')
+    for statement, count in stats.repeated():
+        problems.append(f'{count}x {statement[:200]}')
+    return problems
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    context._sql_stats_start = time.perf_counter()
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.seconds += time.perf_counter() - context._sql_stats_start
+    key = fingerprint(statement)
+    stats.fingerprints[key] += 1
+    if app.config['SQL_STRICT']:
+        # Fail where the offending statement runs, so the traceback points at it
+        budget = _budget()
+        if stats.queries == budget + 1:
+            raise QueryBudgetExceeded(f'{_scope()}: more than {budget} queries')
+        if stats.fingerprints[key] == app.config['SQL_REPEAT_LIMIT']:
+            raise QueryBudgetExceeded(f'{_scope()}: {stats.fingerprints[key]}x {key}')
+
+
+# Every engine, including the 'reader' bind of the production storage profile
+with app.app_context():
+    for engine in db.engines.values():
+        event.listen(engine, 'before_cursor_execute', _start_timer)
+        event.listen(engine, 'after_cursor_execute', _record)
+
+
+@app.after_request
+def sql_stats_headers(response):
+    stats = current_stats()
+    response.headers['X-SQL-Queries'] = str(stats.queries)
+    response.headers['X-SQL-Time'] = f'{stats.seconds * 1000:.2f}ms'
+    response.headers['X-SQL-Max-Repeat'] = str(stats.max_repeat())
+    g.sql_stats_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def log_sql_stats(exc):
+    # g outlives the request when an outer app context is active (tests, the
+    # Socket.IO test client), so the next request must start from zero
+    stats = g.pop('sql_stats', None)
+    status = g.pop('sql_stats_status', None)
+    if stats is None or not stats.queries:
+        return
+    problems = _problems(stats)
+    line = _scope()
+    if status is not None:
+        line['status'] = status
+    line.update(queries=stats.queries, sql_ms=round(stats.seconds * 1000, 2), max_repeat=stats.max_repeat())
+    if problems:
+        line['problems'] = problems
+        app.logger.warning('sql %s', json.dumps(line))
+    else:
+        app.logger.info('sql %s', json.dumps(line))
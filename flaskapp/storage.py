@@ -0,0 +1,125 @@
+from flask import request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+from flaskapp.metrics import TimedQueuePool
+
+READER = 'reader'
+# Connection kept for background batch writers (the chat buffer), so they never queue
+# behind requests for the single writer connection
+WRITE_BEHIND = 'write_behind'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# SQLITE_PROFILE settings. 'default' leaves SQLite and the pool as they come: rollback
+# journal, one engine. 'production' switches the file to WAL so readers and the writer
+# stop blocking each other, and splits reads off to their own pool and background
+# batch writes to a reserved connection.
+PROFILES = {
+    'default': {
+        'pragmas': [],
+        'split': False,
+    },
+    'production': {
+        'pragmas': [
+            ('journal_mode', 'WAL'),
+            # Durable at checkpoints rather than every commit; safe with WAL
+            ('synchronous', 'NORMAL'),
+            ('busy_timeout', 5000),
+            # 64 MB page cache per connection (negative means KiB) and 256 MB of mmap
+            ('cache_size', -65536),
+            ('mmap_size', 268435456),
+            ('temp_store', 'MEMORY'),
+        ],
+        'split': True,
+        'reader_pool_size': 8,
+        'reader_max_overflow': 8,
+        # One writer connection: SQLite takes one writer at a time anyway, so requests
+        # queue for it in the pool (see db_pool_wait_seconds) instead of spinning on
+        # SQLITE_BUSY inside the database
+        'writer_pool_size': 1,
+        # The chat flusher's own connection; its short inserts wait on busy_timeout
+        # between request commits rather than on the writer pool
+        'write_behind_pool_size': 1,
+        'pool_timeout': 30,
+    },
+}
+
+
+def engine_config(uri, profile_name):
+    """SQLALCHEMY_ENGINE_OPTIONS and SQLALCHEMY_BINDS for a storage profile."""
+    if ':memory:' in uri:
+        return {}, {}
+    profile = PROFILES[profile_name]
+    if not uri.startswith('sqlite') or not profile['split']:
+        return {'poolclass': TimedQueuePool}, {}
+    writer = {
+        'poolclass': TimedQueuePool,
+        'pool_size': profile['writer_pool_size'],
+        'max_overflow': 0,
+        'pool_timeout': profile['pool_timeout'],
+    }
+    reader = {
+        'url': uri,
+        'poolclass': TimedQueuePool,
+        'pool_size': profile['reader_pool_size'],
+        'max_overflow': profile['reader_max_overflow'],
+        'pool_timeout': profile['pool_timeout'],
+    }
+    write_behind = {
+        'url': uri,
+        'poolclass': TimedQueuePool,
+        'pool_size': profile['write_behind_pool_size'],
+        'max_overflow': 0,
+        'pool_timeout': profile['pool_timeout'],
+    }
+    return writer, {READER: reader, WRITE_BEHIND: write_behind}
+
+
+def apply_pragmas(db, profile_name):
+    """Run the profile's pragmas on every new connection of every engine. Call inside
+    an app context, before the first query."""
+    pragmas = PROFILES[profile_name]['pragmas']
+    for key, engine in db.engines.items():
+        if engine.dialect.name != 'sqlite' or not pragmas:
+            continue
+        statements = [f'PRAGMA {name}={value}' for name, value in pragmas]
+        if key == READER:
+            # Anything that slips past RoutingSession and tries to write fails loudly
+            statements.append('PRAGMA query_only=1')
+        event.listen(engine, 'connect', _pragma_listener(statements))
+
+
+def _pragma_listener(statements):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+    return set_pragmas
+
+
+def _is_read(clause):
+    if clause is None or isinstance(clause, UpdateBase):
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return True
+
+
+class RoutingSession(Session):
+    """Sends SELECTs issued while serving a GET request or a Socket.IO event to the
+    reader engine, and everything else to the default (writer) engine.
+
+    Once a session has used the writer it sticks to it, so a request reads its own
+    writes. POST requests, CLI commands and background threads always use the writer.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not getattr(self, '_uses_writer', False) and _is_read(clause):
+            engines = self._db.engines
+            if READER in engines and has_request_context() and (
+                    request.method in SAFE_METHODS or getattr(request, 'event', None) is not None):
+                return engines[READER]
+        self._uses_writer = True
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
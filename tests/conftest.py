@@ -0,0 +1,39 @@
+import os
+import tempfile
+import pytest
+
+# The app reads its configuration at import time, so point it at a scratch database
+# (and cheap bcrypt) before anything imports flaskapp
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+
+from flaskapp import app, db, seed  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def seeded():
+    """A small seeded database, shared by the whole run. Tests that change rows pick
+    their own and leave the rest alone."""
+    with app.app_context():
+        seed.load(users=200, providers=20, orders=2000, reset=True)
+        db.session.remove()
+    return app
+
+
+@pytest.fixture
+def session(seeded):
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+
+
+@pytest.fixture
+def client(seeded):
+    return app.test_client()
+
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
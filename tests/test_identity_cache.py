@@ -0,0 +1,68 @@
+import time
+import pytest
+from flaskapp import app, db
+from flaskapp.identity_cache import IdentityCache, identity_cache
+from flaskapp.models import User, ServiceProvider, load_user
+
+
+@pytest.fixture
+def provider_id(seeded):
+    with app.app_context():
+        provider_id = db.session.query(ServiceProvider.id).filter(ServiceProvider.verified == True).first()[0]
+        db.session.remove()
+    identity_cache.invalidate(provider_id)
+    return provider_id
+
+
+def load(user_id):
+    # Each request starts with a fresh session
+    with app.app_context():
+        user = load_user(str(user_id))
+        return user.username, user.is_admin, user.is_verified_provider
+
+
+def change(user_id, **values):
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        provider = db.session.get(ServiceProvider, user_id)
+        for name, value in values.items():
+            setattr(provider if name == 'verified' else user, name, value)
+        db.session.commit()
+
+
+def test_second_load_is_a_hit(provider_id):
+    hits = identity_cache.stats()['hits']
+    assert load(provider_id) == load(provider_id)
+    assert identity_cache.stats()['hits'] == hits + 1
+
+
+@pytest.mark.parametrize('name, value', [('username', 'renamed_provider'), ('is_admin', True), ('verified', False)])
+def test_committed_changes_drop_the_entry(provider_id, name, value):
+    original = load(provider_id)
+    previous = {'username': original[0], 'is_admin': original[1], 'verified': original[2]}[name]
+    change(provider_id, **{name: value})
+    try:
+        assert identity_cache.get(provider_id) is None
+        reloaded = load(provider_id)
+        assert reloaded[('username', 'is_admin', 'verified').index(name)] == value
+    finally:
+        change(provider_id, **{name: previous})
+    assert load(provider_id) == original
+
+
+def test_rolled_back_changes_keep_the_entry(provider_id):
+    original = load(provider_id)
+    with app.app_context():
+        db.session.get(User, provider_id).username = 'never_committed'
+        db.session.flush()
+        db.session.rollback()
+    assert identity_cache.get(provider_id) is not None
+    assert load(provider_id) == original
+
+
+def test_entries_expire_after_ttl(session):
+    cache = IdentityCache(maxsize=2, ttl=0.01)
+    cache.put(1, session.get(User, 1))
+    assert cache.get(1) is not None
+    time.sleep(0.02)
+    assert cache.get(1) is None
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import event
+from flaskapp import db, order_status
+from flaskapp.models import Order, OrderStatus, Notification
+
+
+@pytest.fixture
+def pending(session):
+    return session.query(Order).filter(Order.status == OrderStatus.pending).order_by(Order.id).limit(2).all()
+
+
+def outcomes(results):
+    return [result.outcome for result in results]
+
+
+def test_legal_transition_updates_and_notifies(session, pending):
+    order = pending[0]
+    results = order_status.transition_orders(order.service_provider_id, [(order.id, OrderStatus.accepted)])
+    assert results == [order_status.TransitionResult(order.id, order_status.UPDATED, OrderStatus.pending,
+                                                     OrderStatus.accepted)]
+    session.flush()
+    assert session.get(Order, order.id).status == OrderStatus.accepted
+    assert session.query(Notification).filter_by(user_id=order.customer_id, order_id=order.id).count() >= 1
+
+
+def test_illegal_unchanged_and_not_found(session, pending):
+    order = pending[0]
+    provider_id = order.service_provider_id
+    assert outcomes(order_status.transition_orders(provider_id, [(order.id, OrderStatus.completed)])) == [order_status.ILLEGAL]
+    assert outcomes(order_status.transition_orders(provider_id, [(order.id, OrderStatus.pending)])) == [order_status.UNCHANGED]
+    assert outcomes(order_status.transition_orders(provider_id, [(10 ** 9, OrderStatus.accepted)])) == [order_status.NOT_FOUND]
+    assert session.get(Order, order.id).status == OrderStatus.pending
+
+
+def test_other_providers_orders_are_forbidden(session, pending):
+    order = pending[0]
+    results = order_status.transition_orders(order.service_provider_id + 1, [(order.id, OrderStatus.accepted)])
+    assert outcomes(results) == [order_status.FORBIDDEN]
+    assert session.get(Order, order.id).status == OrderStatus.pending
+
+
+def test_order_changed_meanwhile_is_a_conflict(session, pending):
+    order, other = pending
+    if other.service_provider_id != order.service_provider_id:
+        other = None
+
+    def change_status_first(connection, cursor, statement, parameters, context, executemany):
+        # Another request rejects the order between the read and the guarded UPDATE
+        if statement.startswith('UPDATE "order"'):
+            cursor.execute('UPDATE "order" SET status = ? WHERE id = ?', (OrderStatus.rejected.name, order.id))
+
+    event.listen(db.engine, 'before_cursor_execute', change_status_first)
+    try:
+        changes = [(order.id, OrderStatus.accepted)] + ([(other.id, OrderStatus.accepted)] if other else [])
+        results = order_status.transition_orders(order.service_provider_id, changes)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', change_status_first)
+    assert results[0].outcome == order_status.CONFLICT
+    assert all(result.outcome == order_status.UPDATED for result in results[1:])
+    session.expire_all()
+    assert session.get(Order, order.id).status == OrderStatus.rejected
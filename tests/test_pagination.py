@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+import pytest
+from flaskapp.models import Order
+from flaskapp.pagination import InvalidCursor, encode_cursor, decode_cursor, keyset_paginate
+
+ORDER_KEYS = [(Order.order_datetime, True), (Order.id, True)]
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def walk(query, keys, per_page):
+    ids, cursor = [], None
+    while True:
+        page = keyset_paginate(query, keys, cursor, per_page)
+        ids += [order.id for order in page]
+        if not page.has_next:
+            return ids
+        cursor = page.next_cursor
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 5, 1, 12, 30), 42, 'cleaning', 3.5, None, True]
+    assert decode_cursor(encode_cursor('prev', values)) == ('prev', values)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    raw_cursor(['sideways', [1]]),
+    raw_cursor(['next', 5]),
+    raw_cursor(['next', [[1, 2], 3]]),
+    raw_cursor(['next', [{'dt': 1}]]),
+    raw_cursor(['next', [{'dt': '2024-01-01', 'x': 1}]]),
+    raw_cursor(['next', [{'not': 'a date'}]]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize('cursor', [raw_cursor(['next', [[1, 2], 3, 4, 5]]), raw_cursor(['next', [1]]), '%%%'])
+def test_malformed_cursor_is_a_400(client, cursor):
+    response = client.get('/search_result', query_string={'query': 'cleaning', 'cursor': cursor})
+    assert response.status_code == 400
+
+
+def test_pages_cover_every_row_once(session):
+    query = session.query(Order).filter(Order.customer_id.in_([5, 6, 7, 8, 9]))
+    expected = [order.id for order in query.order_by(Order.order_datetime.desc(), Order.id.desc())]
+    assert len(expected) > 7
+    assert walk(query, ORDER_KEYS, 7) == expected
+
+
+def test_prev_cursor_returns_the_previous_page(session):
+    query = session.query(Order).filter(Order.customer_id.in_([5, 6, 7, 8, 9]))
+    first = keyset_paginate(query, ORDER_KEYS, None, 5)
+    second = keyset_paginate(query, ORDER_KEYS, first.next_cursor, 5)
+    back = keyset_paginate(query, ORDER_KEYS, second.prev_cursor, 5)
+    assert [order.id for order in back] == [order.id for order in first]
+    assert not back.has_prev
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_null_sort_keys_are_paged_through(session, descending):
+    query = session.query(Order).filter(Order.customer_id.in_([5, 6, 7, 8, 9]))
+    ids = [order.id for order in query.order_by(Order.id)]
+    query.filter(Order.id.in_(ids[::3])).update({'order_datetime': None}, synchronize_session=False)
+    keys = [(Order.order_datetime, descending), (Order.id, descending)]
+    direction = (lambda column: column.desc()) if descending else (lambda column: column.asc())
+    expected = [order.id for order in query.order_by(direction(Order.order_datetime), direction(Order.id))]
+    assert walk(query, keys, 4) == expected
@@ -0,0 +1,16 @@
+from flaskapp import query_plans
+
+
+def test_pages_use_indexes(seeded):
+    statements = query_plans.collect()
+    assert statements
+    scans = query_plans.full_scans(statements)
+    assert scans == [], '\n'.join(f'{endpoint}: {plan}\n    {" ".join(statement.split())}'
+                                  for endpoint, statement, plan in scans)
+
+
+def test_unselective_index_walk_is_reported(seeded):
+    # A LIMIT doesn't excuse an index walk whose order isn't the ORDER BY's
+    statement = 'SELECT id FROM "order" INDEXED BY ix_order_customer_id_order_datetime ORDER BY price LIMIT 5'
+    scans = query_plans.full_scans({('home', statement): ()})
+    assert [plan for _, _, plan in scans] == ['SCAN order USING INDEX ix_order_customer_id_order_datetime']
@@ -0,0 +1,72 @@
+from flaskapp import app, db
+from flaskapp.models import Service, Order, User
+from flaskapp.response_cache import response_cache, bump_on_commit
+
+
+def version(name):
+    return response_cache.versions((name,))[0]
+
+
+def test_commit_bumps_versions(session):
+    order = session.query(Order).filter(Order.review.isnot(None)).first()
+    catalog, reviews = version('catalog'), version(f'service:{order.ser_id}')
+    service = session.get(Service, order.ser_id)
+    service.description += ' '
+    order.review += ' '
+    session.commit()
+    assert version('catalog') == catalog + 1
+    assert version(f'service:{order.ser_id}') == reviews + 1
+
+
+def test_rollback_discards_pending_bumps(session):
+    service = session.query(Service).first()
+    catalog = version('catalog')
+    service.description += ' '
+    session.flush()
+    bump_on_commit('catalog')
+    session.rollback()
+    # The next commit in the session doesn't carry the rolled back bumps along
+    session.execute(db.update(User).where(User.id == 2).values(image_file='default.jpg'))
+    session.commit()
+    assert version('catalog') == catalog
+
+
+def test_core_writes_bump_explicitly(session):
+    before = version('users')
+    session.execute(db.update(User).where(User.id == 2).values(image_file='default.jpg'))
+    bump_on_commit('users')
+    session.commit()
+    assert version('users') == before + 1
+
+
+def test_username_change_bumps_users(session):
+    user = session.get(User, 3)
+    before = version('users')
+    user.username += 'x'
+    session.commit()
+    assert version('users') == before + 1
+    user.username = user.username[:-1]
+    session.commit()
+
+
+def test_cached_page_is_rerendered_after_a_write(client):
+    with app.app_context():
+        service_id = db.session.query(Service.id).first()[0]
+    url = f'/service/{service_id}'
+    first = client.get(url)
+    assert first.status_code == 200
+    hits = response_cache.stats()['hits']
+    assert client.get(url).get_data() == first.get_data()
+    assert response_cache.stats()['hits'] == hits + 1
+    assert client.get(url, headers={'If-None-Match': first.get_etag()[0]}).status_code == 304
+
+    with app.app_context():
+        service = db.session.get(Service, service_id)
+        title = service.title
+        service.title = 'Freshly renamed service'
+        db.session.commit()
+        try:
+            assert b'Freshly renamed service' in client.get(url).get_data()
+        finally:
+            service.title = title
+            db.session.commit()